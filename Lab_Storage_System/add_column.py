@@ -1,15 +1,10 @@
-import sqlite3
+# add_column.py
+# equipment_num (and every other column) is now added by the migration engine.
+from db import close_all_connections
+from migrations import migrate, schema_version
 
-conn = sqlite3.connect('storage.db')
-cursor = conn.cursor()
+before = schema_version()
+migrate()
+print(f"Schema version {before} -> {schema_version()}.")
 
-# Check if the column exists
-cursor.execute("PRAGMA table_info(equipment)")
-columns = [col[1] for col in cursor.fetchall()]
-
-if "equipment_num" not in columns:
-    cursor.execute("ALTER TABLE equipment ADD COLUMN equipment_num TEXT;")
-    print("Added column 'equipment_num'.")
-
-conn.commit()
-conn.close()
+close_all_connections()
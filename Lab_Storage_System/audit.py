@@ -1,28 +1,189 @@
 # audit.py
-import sqlite3
-from datetime import datetime
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from db import get_connection, transaction
+from audit_partitions import archive_cold_partitions, write_events
+
+AUDIT_BATCH_SIZE = 200          # flush once this many events are waiting
+AUDIT_FLUSH_INTERVAL = 2.0      # ...or once the oldest waiting event is this old (seconds)
+AUDIT_QUEUE_SIZE = 5000         # producers block when the queue is this full
+AUDIT_PUT_TIMEOUT = 5.0         # after blocking this long, write the event inline
+AUDIT_ARCHIVE_INTERVAL = 24 * 3600  # how often the writer rolls off cold partitions
+AUDIT_RETRY_INTERVAL = 5.0      # seconds between attempts to write events that failed
+
+
+class AuditWriter(threading.Thread):
+    """Background thread that writes queued audit events in batched transactions.
+
+    Events whose batch fails to write are kept and retried with the next
+    batch (at least every AUDIT_RETRY_INTERVAL seconds) rather than dropped.
+    """
+
+    def __init__(self):
+        super().__init__(name="audit-writer", daemon=True)
+        self.queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+        self._stop_event = threading.Event()
+        self._flush_event = threading.Event()  # set while someone waits in flush()
+        self._flushing = 0
+        self._unwritten = []  # events from failed batches, retried first
+        self._counter_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.inline_writes = 0
+
+    def submit(self, event):
+        with self._counter_lock:
+            self.submitted += 1
+        try:
+            self.queue.put(event, timeout=AUDIT_PUT_TIMEOUT)
+        except queue.Full:
+            # Writer can't keep up; never drop a compliance record
+            if not self._write([event]):
+                with self._counter_lock:
+                    self._unwritten.append(event)
+            with self._counter_lock:
+                self.inline_writes += 1
+
+    def flush(self):
+        """Block until every event submitted so far has been written (or kept for a retry).
+
+        The writer stops waiting for its batch to fill while anyone is
+        flushing, so this returns as soon as the queue is written.
+        """
+        if not self.is_alive():
+            return
+        with self._counter_lock:
+            self._flushing += 1
+            self._flush_event.set()
+        try:
+            self.queue.join()
+        finally:
+            with self._counter_lock:
+                self._flushing -= 1
+                if not self._flushing:
+                    self._flush_event.clear()
+
+    def stop(self):
+        self._stop_event.set()
+        self.flush()
+
+    def stats(self):
+        with self._counter_lock:
+            return {
+                "queued": self.queue.qsize(),
+                "submitted": self.submitted,
+                "written": self.written,
+                "batches": self.batches,
+                "failed": self.failed,
+                "unwritten": len(self._unwritten),
+                "inline_writes": self.inline_writes,
+            }
+
+    def run(self):
+        next_archive = time.monotonic()
+        while not (self._stop_event.is_set() and self.queue.empty() and not self._unwritten):
+            if time.monotonic() >= next_archive:
+                next_archive = time.monotonic() + AUDIT_ARCHIVE_INTERVAL
+                self._archive()
+            batch = []
+            try:
+                batch.append(self.queue.get(
+                    timeout=AUDIT_RETRY_INTERVAL if self._unwritten else AUDIT_FLUSH_INTERVAL))
+            except queue.Empty:
+                if not self._unwritten:
+                    continue
+            try:
+                deadline = time.monotonic() + AUDIT_FLUSH_INTERVAL
+                while batch and len(batch) < AUDIT_BATCH_SIZE:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._stop_event.is_set() or self._flush_event.is_set():
+                        try:
+                            batch.append(self.queue.get_nowait())
+                            continue
+                        except queue.Empty:
+                            break
+                    try:
+                        batch.append(self.queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                with self._counter_lock:
+                    events, self._unwritten = self._unwritten + batch, []
+                if not self._write(events):
+                    with self._counter_lock:
+                        self._unwritten = events + self._unwritten
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _archive(self):
+        try:
+            archived = archive_cold_partitions()
+            if archived:
+                print(f"[AUDIT] Archived partitions: {', '.join(archived)}")
+        except Exception as e:  # a dead writer would leave flush() waiting forever
+            print(f"[AUDIT ERROR] Archiving failed: {e}")
+
+    def _write(self, batch):
+        """Write batch in one transaction; returns False (the caller keeps it) if that failed."""
+        try:
+            with transaction():
+                write_events(get_connection(), batch)
+        except Exception as e:
+            with self._counter_lock:
+                self.failed += len(batch)
+            print(f"[AUDIT ERROR] Failed to write {len(batch)} event(s), will retry: {e}")
+            return False
+        with self._counter_lock:
+            self.written += len(batch)
+            self.batches += 1
+        return True
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = AuditWriter()
+            _writer.start()
+        return _writer
+
+
+def flush_audit_log():
+    if _writer is not None:
+        _writer.flush()
+
+
+def shutdown_audit_writer():
+    """Write everything still queued and stop the writer thread."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+        writer.join(timeout=AUDIT_FLUSH_INTERVAL * 2)
+        unwritten = writer.stats()["unwritten"]
+        if unwritten:
+            print(f"[AUDIT ERROR] {unwritten} event(s) could not be written before shutdown")
+
+
+def audit_stats():
+    return _writer.stats() if _writer is not None else {}
 
-DB_NAME = "storage.db"
 
 class AuditLogger:
     def __init__(self, user_id):
         self.user_id = user_id
 
     def log(self, action, details=""):
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS audit_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                action TEXT,
-                details TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        cursor.execute(
-            'INSERT INTO audit_log (user_id, action, details) VALUES (?, ?, ?)',
-            (self.user_id, action, details)
-        )
-        conn.commit()
-        conn.close()
+        # Same format/zone as the column's CURRENT_TIMESTAMP default, taken at
+        # call time rather than when the batch is written
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        get_writer().submit((self.user_id, action, details, timestamp))
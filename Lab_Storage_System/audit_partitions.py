@@ -0,0 +1,212 @@
+# audit_partitions.py
+# Monthly partitioning for the audit trail. Each month lives in its own
+# audit_log_YYYY_MM table (indexed on timestamp and user_id); audit_partitions
+# catalogues them. Months older than AUDIT_HOT_MONTHS are rolled off into
+# gzip'd JSON-lines files under AUDIT_ARCHIVE_DIR and their tables dropped.
+# audit_log itself is a UNION ALL view over the hot partitions. Ids come
+# from the single audit_sequence row rather than each table's own rowid, so
+# they stay unique (and in write order) across partitions and archives.
+import gzip
+import json
+import os
+import sqlite3
+from datetime import date, datetime, timezone
+
+from db import get_connection, transaction
+
+AUDIT_HOT_MONTHS = 12
+AUDIT_ARCHIVE_DIR = "audit_archive"
+
+_COLUMNS = "id, user_id, action, details, timestamp"
+_known = set()  # months whose partition table is known to exist (per process)
+
+
+def month_of(timestamp):
+    """'YYYY-MM' for a 'YYYY-MM-DD HH:MM:SS' string, date or datetime."""
+    if isinstance(timestamp, (date, datetime)):
+        return timestamp.strftime('%Y-%m')
+    return str(timestamp)[:7]
+
+
+def table_for(month):
+    return "audit_log_" + month.replace("-", "_")
+
+
+def _as_timestamp(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def _shift_month(month, delta):
+    year, mon = int(month[:4]), int(month[5:7])
+    index = year * 12 + (mon - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def rebuild_view(conn):
+    hot = [row[0] for row in conn.execute(
+        "SELECT table_name FROM audit_partitions WHERE archive_path IS NULL ORDER BY month")]
+    conn.execute("DROP VIEW IF EXISTS audit_log")
+    if hot:
+        body = " UNION ALL ".join(f"SELECT {_COLUMNS} FROM {name}" for name in hot)
+    else:
+        body = ("SELECT NULL AS id, NULL AS user_id, NULL AS action, "
+                "NULL AS details, NULL AS timestamp WHERE 0")
+    conn.execute(f"CREATE VIEW audit_log AS {body}")
+
+
+def ensure_partition(conn, month):
+    """Create the hot partition for month if needed; call inside a transaction.
+
+    A late event for an already archived month gets a fresh hot table next to
+    the archive file; queries read both.
+    """
+    name = table_for(month)
+    if month in _known:
+        return name
+    row = conn.execute(
+        "SELECT 1 FROM audit_partitions WHERE month = ? AND archive_path IS NULL", (month,)).fetchone()
+    if row is None:
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            action TEXT,
+            details TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )''')
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_timestamp ON {name}(timestamp)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_user ON {name}(user_id, timestamp)")
+        conn.execute("INSERT INTO audit_partitions (month, table_name) VALUES (?, ?)", (month, name))
+        rebuild_view(conn)
+    _known.add(month)
+    return name
+
+
+def _reserve_ids(conn, count):
+    """First of count consecutive audit ids; call inside a transaction."""
+    row = conn.execute("SELECT last_id FROM audit_sequence WHERE id = 1").fetchone()
+    first = (row[0] if row else 0) + 1
+    conn.execute('''INSERT INTO audit_sequence (id, last_id) VALUES (1, ?)
+                    ON CONFLICT(id) DO UPDATE SET last_id = excluded.last_id''', (first + count - 1,))
+    return first
+
+
+def write_events(conn, events):
+    """Insert (user_id, action, details, timestamp) tuples into their monthly partitions.
+
+    Call inside a transaction: the ids are reserved from audit_sequence.
+    """
+    first = _reserve_ids(conn, len(events))
+    by_month = {}
+    for offset, event in enumerate(events):
+        by_month.setdefault(month_of(event[3]), []).append((first + offset,) + tuple(event))
+    for month, rows in by_month.items():
+        name = ensure_partition(conn, month)
+        sql = f"INSERT INTO {name} (id, user_id, action, details, timestamp) VALUES (?, ?, ?, ?, ?)"
+        try:
+            conn.executemany(sql, rows)
+        except sqlite3.OperationalError:
+            # Another client may have archived (dropped) it since we cached it
+            _known.discard(month)
+            ensure_partition(conn, month)
+            conn.executemany(sql, rows)
+
+
+def _archive_path(archive_dir, name):
+    path = os.path.join(archive_dir, f"{name}.jsonl.gz")
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = os.path.join(archive_dir, f"{name}.{suffix}.jsonl.gz")
+    return path
+
+
+def archive_cold_partitions(keep_months=AUDIT_HOT_MONTHS, archive_dir=AUDIT_ARCHIVE_DIR):
+    """Move partitions older than keep_months into compressed files; returns months archived."""
+    cutoff = _shift_month(datetime.now(timezone.utc).strftime('%Y-%m'), -keep_months)
+    conn = get_connection()
+    cold = conn.execute(
+        "SELECT month, table_name FROM audit_partitions WHERE archive_path IS NULL AND month < ? ORDER BY month",
+        (cutoff,)).fetchall()
+    archived = []
+    if cold:
+        os.makedirs(archive_dir, exist_ok=True)
+    for month, name in cold:
+        path = _archive_path(archive_dir, name)
+        tmp_path = path + ".tmp"
+        with transaction():
+            rows = conn.execute(f"SELECT {_COLUMNS} FROM {name} ORDER BY timestamp, id").fetchall()
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row) + "\n")
+            os.replace(tmp_path, path)
+            conn.execute(
+                "UPDATE audit_partitions SET archive_path = ?, row_count = ? WHERE month = ? AND archive_path IS NULL",
+                (path, len(rows), month))
+            conn.execute(f"DROP TABLE {name}")
+            rebuild_view(conn)
+        _known.discard(month)
+        archived.append(month)
+    return archived
+
+
+def _read_archive(path, start, end, user_id, action):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            row = tuple(json.loads(line))
+            if start is not None and row[4] < start:
+                continue
+            if end is not None and row[4] >= end:
+                continue
+            if user_id is not None and row[1] != user_id:
+                continue
+            if action is not None and row[2] != action:
+                continue
+            yield row
+
+
+def query_audit_log(start=None, end=None, user_id=None, action=None):
+    """Audit rows with start <= timestamp < end, oldest first.
+
+    Only partitions whose month overlaps the range are touched: hot ones via
+    their timestamp/user indexes, archived ones by streaming their file.
+    """
+    start, end = _as_timestamp(start), _as_timestamp(end)
+    conn = get_connection()
+    sql = "SELECT month, table_name, archive_path FROM audit_partitions WHERE 1 = 1"
+    params = []
+    if start is not None:
+        sql += " AND month >= ?"
+        params.append(month_of(start))
+    if end is not None:
+        sql += " AND month <= ?"
+        params.append(month_of(end))
+    partitions = conn.execute(sql + " ORDER BY month", params).fetchall()
+
+    results = []
+    for month, name, archive_path in partitions:
+        if archive_path is not None:
+            results.extend(_read_archive(archive_path, start, end, user_id, action))
+            continue
+        where, args = [], []
+        if start is not None:
+            where.append("timestamp >= ?")
+            args.append(start)
+        if end is not None:
+            where.append("timestamp < ?")
+            args.append(end)
+        if user_id is not None:
+            where.append("user_id = ?")
+            args.append(user_id)
+        if action is not None:
+            where.append("action = ?")
+            args.append(action)
+        clause = (" WHERE " + " AND ".join(where)) if where else ""
+        results.extend(conn.execute(
+            f"SELECT {_COLUMNS} FROM {name}{clause} ORDER BY timestamp, id", args).fetchall())
+    # A month can have both an archive file and a hot table of late arrivals
+    results.sort(key=lambda row: (row[4], row[0]))
+    return results
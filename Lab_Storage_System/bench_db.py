@@ -0,0 +1,54 @@
+# bench_db.py
+# Compares per-query latency of a fresh connection per call (the old db_query)
+# against the pooled connection in db.py. Runs against a scratch database.
+import os
+import sqlite3
+import tempfile
+import time
+
+import db
+
+ITERATIONS = 2000
+
+
+def old_db_query(query, params=(), fetchone=False):
+    conn = sqlite3.connect(db.DB_NAME)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        result = cursor.fetchone() if fetchone else cursor.fetchall()
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+
+
+def time_calls(func, query, params=(), fetchone=False):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func(query, params, fetchone)
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db_query = db.db_query
+        db_query("CREATE TABLE equipment (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, equipment_num TEXT)")
+        for i in range(500):
+            db_query("INSERT INTO equipment (name, equipment_num) VALUES (?, ?)", (f"Item {i}", f"EQ-{i:04d}"))
+
+        cases = [
+            ("point lookup", "SELECT name FROM equipment WHERE id = ?", (250,), True),
+            ("list 500 rows", "SELECT id, name FROM equipment", (), False),
+        ]
+        print(f"{'query':<16}{'fresh conn (us)':>18}{'pooled (us)':>14}{'speedup':>10}")
+        for label, query, params, fetchone in cases:
+            before = time_calls(old_db_query, query, params, fetchone)
+            after = time_calls(db_query, query, params, fetchone)
+            print(f"{label:<16}{before:>18.1f}{after:>14.1f}{before / after:>9.1f}x")
+        db.close_all_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# blob_store.py
+# Content-addressed storage for uploaded reports and procedures. Every
+# distinct file body is kept once under BLOB_ROOT/<aa>/<sha256>; the files
+# users see in uploaded_reports/ and uploaded_procedures/ are hardlinks to
+# it (or copies where the filesystem can't link; reflinked, so copy-on-write,
+# where it supports that). blobs counts the references recorded in blob_refs
+# so a blob is only freed with its last entry.
+# Blobs are read-only, and so are the entries hardlinked to them, so editing
+# one folder entry in place can't change what every other entry sharing the
+# blob shows. A blob is also re-hashed before new uploads are deduplicated
+# onto it; one that no longer matches its name is replaced.
+import hashlib
+import os
+import sqlite3
+import stat
+import uuid
+from collections import namedtuple
+from datetime import datetime
+
+from db import get_connection, transaction
+from file_index import forget, record
+from storage_io import CopyCancelled, copy_file
+from text_search import forget_documents
+
+BLOB_ROOT = "blob_store"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+StoredFile = namedtuple("StoredFile", "src dst size sha256 deduplicated")
+
+
+StoreCancelled = CopyCancelled
+
+
+def blob_path(sha256):
+    return os.path.join(BLOB_ROOT, sha256[:2], sha256)
+
+
+def _ref_key(path):
+    return os.path.normpath(path)
+
+
+def sha256_of(path, is_cancelled=lambda: False, on_bytes=lambda n: None):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            if is_cancelled():
+                raise StoreCancelled()
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            on_bytes(len(chunk))
+    return digest.hexdigest()
+
+
+def _protect(path):
+    os.chmod(path, stat.S_IMODE(os.stat(path).st_mode) & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def _replace(tmp, path):
+    """os.replace that also overwrites a read-only path (Windows refuses to)."""
+    try:
+        os.replace(tmp, path)
+    except PermissionError:
+        if not os.path.exists(path):
+            raise
+        os.chmod(path, stat.S_IMODE(os.stat(path).st_mode) | stat.S_IWUSR)
+        os.replace(tmp, path)
+
+
+def _remove(path):
+    """os.remove that also removes a read-only path (Windows refuses to; a blob made
+    writable through its link this way is protected again on its next use)."""
+    try:
+        os.remove(path)
+    except PermissionError:
+        os.chmod(path, stat.S_IMODE(os.stat(path).st_mode) | stat.S_IWUSR)
+        os.remove(path)
+
+
+def _blob_intact(blob, sha256, is_cancelled):
+    """True if blob exists and still hashes to sha256 (and is read-only from now on)."""
+    try:
+        if sha256_of(blob, is_cancelled) != sha256:
+            print(f"[BLOB STORE] {blob} no longer matches its checksum; storing it again")
+            return False
+        _protect(blob)  # blobs stored before they were made read-only
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _copy_into_store(src, sha256, is_cancelled):
+    target = blob_path(sha256)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+    copy_file(src, tmp, is_cancelled)  # removes tmp itself on failure
+    _protect(tmp)
+    _replace(tmp, target)
+    return target
+
+
+def _link(blob, dst):
+    """Point dst at the blob: hardlink if possible, otherwise a writable copy."""
+    tmp = f"{dst}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(blob, tmp)
+    except OSError:
+        copy_file(blob, tmp)
+        os.chmod(tmp, stat.S_IMODE(os.stat(tmp).st_mode) | stat.S_IWUSR)
+    _replace(tmp, dst)
+
+
+def store_file(src, dst, is_cancelled=lambda: False, on_bytes=lambda n: None):
+    """Put src's content in the blob store and make dst refer to it.
+
+    A body that is already stored costs one hashing pass and no copy.
+    on_bytes gets half of each chunk while hashing and the rest once stored.
+    Copying and linking happen before the transaction, which only records
+    the blobs/blob_refs rows, so a slow copy (no hardlinks on the share)
+    doesn't hold the database write lock.
+    """
+    size = os.path.getsize(src)
+    half = {"hashed": 0}
+
+    def hashed(n):
+        half["hashed"] += n // 2
+        on_bytes(n // 2)
+
+    sha256 = sha256_of(src, is_cancelled, hashed)
+    blob = blob_path(sha256)
+    conn = get_connection()
+    known = conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+    deduplicated = known is not None and _blob_intact(blob, sha256, is_cancelled)
+    if not deduplicated:
+        _copy_into_store(src, sha256, is_cancelled)
+    if is_cancelled():
+        raise StoreCancelled()
+    try:
+        _link(blob, dst)
+    except FileNotFoundError:
+        # Freed by a concurrent delete after we looked it up
+        _copy_into_store(src, sha256, is_cancelled)
+        _link(blob, dst)
+
+    key = _ref_key(dst)
+    freed = None
+    with transaction():
+        previous = conn.execute("SELECT sha256 FROM blob_refs WHERE path = ?", (key,)).fetchone()
+        if previous is not None and previous[0] == sha256:
+            pass  # same content dropped on the same name again
+        else:
+            if previous is not None:
+                freed = _release_ref(conn, key, previous[0])
+            conn.execute('''INSERT INTO blobs (sha256, size, ref_count, created_at) VALUES (?, ?, 1, ?)
+                            ON CONFLICT(sha256) DO UPDATE SET ref_count = ref_count + 1''',
+                         (sha256, size, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            conn.execute("INSERT INTO blob_refs (path, sha256) VALUES (?, ?)", (key, sha256))
+        record(dst)
+        # A delete that committed between the link and here may have removed the blob file
+        restore = not os.path.exists(blob)
+    if restore:
+        _copy_into_store(src, sha256, lambda: False)
+    if freed:
+        _remove_blob_file(freed)
+    on_bytes(size - half["hashed"])
+    return StoredFile(src, dst, size, sha256, deduplicated)
+
+
+def _release_ref(conn, key, sha256):
+    """Drop one reference inside a transaction; returns sha256 if the blob is now unused."""
+    conn.execute("DELETE FROM blob_refs WHERE path = ?", (key,))
+    conn.execute("UPDATE blobs SET ref_count = ref_count - 1 WHERE sha256 = ?", (sha256,))
+    row = conn.execute("SELECT ref_count FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+    if row is not None and row[0] <= 0:
+        conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+        return sha256
+    return None
+
+
+def _remove_blob_file(sha256):
+    try:
+        _remove(blob_path(sha256))
+    except FileNotFoundError:
+        pass
+
+
+def delete_stored_file(path):
+    """Remove a folder entry; its blob is freed only when no other entry uses it."""
+    key = _ref_key(path)
+    conn = get_connection()
+    with transaction():
+        row = conn.execute("SELECT sha256 FROM blob_refs WHERE path = ?", (key,)).fetchone()
+        freed = _release_ref(conn, key, row[0]) if row is not None else None
+        if os.path.exists(path):
+            _remove(path)
+        forget(path)
+        forget_documents([path])
+    if freed:
+        _remove_blob_file(freed)
+
+
+def storage_stats():
+    """(distinct blobs, bytes stored, folder entries, bytes those entries would take as copies)."""
+    try:
+        blobs, stored = get_connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        refs, logical = get_connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(b.size), 0) FROM blob_refs r JOIN blobs b ON b.sha256 = r.sha256"
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Database Error: {e}")
+        return 0, 0, 0, 0
+    return blobs, stored, refs, logical
@@ -0,0 +1,160 @@
+# bulk_schedule.py
+# Schedules maintenance for many equipment items at once: from the GUI's
+# multi-select, or from a CSV/XLSX file with equipment_num, scheduled_for
+# and task columns. Rows are streamed from the file and validated against
+# one equipment_num -> id map before the write lock is taken, then written
+# with executemany in a single transaction together with the
+# equipment.next_maintenance updates, so a campaign of hundreds of items
+# costs one commit instead of two per item.
+# XLSX import needs openpyxl (pip install openpyxl); CSV works without it.
+import argparse
+import csv
+import os
+import time
+from datetime import date, datetime
+
+from db import db_execute_many, get_connection, transaction
+
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
+IMPORT_EXTENSIONS = (".csv", ".xlsx")
+# Accepted header spellings (compared lower-cased, spaces as underscores)
+COLUMN_ALIASES = {
+    "equipment_num": ("equipment_num", "equipment_number", "number"),
+    "scheduled_for": ("scheduled_for", "date", "due", "next_maintenance"),
+    "task": ("task", "tasks", "description"),
+}
+
+
+def equipment_ids():
+    """{equipment_num: equipment id} for every numbered equipment item."""
+    return {str(num).strip(): eid for eid, num in get_connection().execute(
+        "SELECT id, equipment_num FROM equipment WHERE equipment_num IS NOT NULL")}
+
+
+def _parse_day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value or "").strip()[:10])
+
+
+def _header_map(header):
+    names = [str(name or "").strip().lower().replace(" ", "_") for name in header]
+    columns = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in names:
+                columns[column] = names.index(alias)
+                break
+    missing = [column for column in ("equipment_num", "scheduled_for") if column not in columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    return columns
+
+
+def _raw_rows(path):
+    """Yield the header, then each row, as lists of cell values."""
+    if os.path.splitext(path)[1].lower() == ".xlsx":
+        if load_workbook is None:
+            raise ValueError("Importing .xlsx files needs openpyxl (pip install openpyxl)")
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.reader(f)
+
+
+def read_schedule(path, ids, rejected):
+    """Stream valid (equipment_id, 'yyyy-mm-dd', task) rows; invalid ones go to rejected as (line, reason)."""
+    rows = _raw_rows(path)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = _header_map(header)
+    seen = set()
+    for line, row in enumerate(rows, start=2):  # line 1 is the header
+        if not any(cell not in (None, "") for cell in row):
+            continue
+        def cell(column):
+            index = columns.get(column)
+            return row[index] if index is not None and index < len(row) else None
+        num = str(cell("equipment_num") or "").strip()
+        task = str(cell("task") or "").strip()
+        equipment_id = ids.get(num)
+        if equipment_id is None:
+            rejected.append((line, f"unknown equipment number '{num}'"))
+            continue
+        try:
+            day = _parse_day(cell("scheduled_for")).isoformat()
+        except (TypeError, ValueError):
+            rejected.append((line, f"bad date '{cell('scheduled_for')}'"))
+            continue
+        if (equipment_id, day) in seen:
+            rejected.append((line, f"{num} is already scheduled for {day} in this file"))
+            continue
+        seen.add((equipment_id, day))
+        yield equipment_id, day, task
+
+
+def schedule_entries(entries, scheduled_by):
+    """Write (equipment_id, 'yyyy-mm-dd', task) entries in one transaction; returns the row count.
+
+    Each item's next_maintenance (and description) becomes its earliest
+    date in the batch. entries may be a generator; it is read (and so the
+    file parsed and validated) before the write lock is taken.
+    """
+    earliest = {}
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    log_rows = []
+    for equipment_id, day, task in entries:
+        if equipment_id not in earliest or day < earliest[equipment_id][0]:
+            earliest[equipment_id] = (day, task)
+        log_rows.append((equipment_id, task, scheduled_by, now, day))
+
+    with transaction():
+        count = db_execute_many('''INSERT INTO maintenance_log (equipment_id, task, scheduled_by, scheduled_at, scheduled_for)
+                                   VALUES (?, ?, ?, ?, ?)''', log_rows)
+        db_execute_many("UPDATE equipment SET next_maintenance = ?, description = ? WHERE id = ?",
+                        [(day, task, equipment_id) for equipment_id, (day, task) in earliest.items()])
+    return count
+
+
+def import_schedule(path, scheduled_by):
+    """Schedule every valid row of a CSV/XLSX file in one transaction.
+
+    Returns (scheduled, rejected, elapsed seconds); rejected lists (line, reason).
+    Raises ValueError if the file can't be read as a schedule.
+    """
+    start = time.perf_counter()
+    rejected = []
+    count = schedule_entries(read_schedule(path, equipment_ids(), rejected), scheduled_by)
+    return count, rejected, time.perf_counter() - start
+
+
+def summary(count, rejected, elapsed):
+    rate = count / elapsed if elapsed > 0 else 0.0
+    text = f"Scheduled {count} task(s) in {elapsed:.2f}s ({rate:.0f} rows/s); rejected {len(rejected)}."
+    for line, reason in rejected[:20]:
+        text += f"\n  line {line}: {reason}"
+    if len(rejected) > 20:
+        text += f"\n  ... and {len(rejected) - 20} more"
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a maintenance schedule.")
+    parser.add_argument("path", help="CSV/XLSX file with equipment_num, scheduled_for, task columns")
+    parser.add_argument("--by", default="import", help="name recorded as scheduled_by")
+    args = parser.parse_args()
+    from migrations import migrate
+    migrate()
+    print(summary(*import_schedule(args.path, args.by)))
@@ -0,0 +1,51 @@
+# calendar_months.py
+# Maintenance tasks for one calendar page at a time. A QCalendarWidget page
+# shows six weeks around the month, so a month's window runs from a week
+# before the 1st to six weeks after it; the range query is answered from
+# idx_maintenance_log_scheduled_for, so its cost follows the month's tasks,
+# not the size of the log. Results go through db's read cache, which keeps
+# the recently viewed (and prefetched) months and drops them on writes.
+# Occurrences of recurring rules that haven't been acknowledged yet aren't in
+# the log; they are expanded for the same window and merged in.
+from datetime import date, timedelta
+
+from db import cached_query
+from recurrence import occurrences_between
+
+MONTH_TASKS_SQL = '''
+    SELECT ml.scheduled_for, ml.id, eq.name, ml.task, ml.acknowledged_by, ml.rule_id
+    FROM maintenance_log ml
+    LEFT JOIN equipment eq ON ml.equipment_id = eq.id
+    WHERE ml.scheduled_for >= ? AND ml.scheduled_for < ?
+    ORDER BY ml.scheduled_for, ml.id
+'''
+MONTH_TABLES = ("maintenance_log", "equipment")
+
+
+def month_window(year, month):
+    """[start, end) ISO dates covering every day a calendar page for the month can show."""
+    first = date(year, month, 1)
+    return (first - timedelta(days=7)).isoformat(), (first + timedelta(days=42)).isoformat()
+
+
+def adjacent_months(year, month):
+    """The (year, month) pages before and after the given one."""
+    previous = (year - 1, 12) if month == 1 else (year, month - 1)
+    following = (year + 1, 1) if month == 12 else (year, month + 1)
+    return previous, following
+
+
+def month_tasks(year, month):
+    """{'yyyy-mm-dd': [(log_id, equipment name, task, acknowledged, rule_id)]} for the month's window.
+
+    log_id is None for a rule occurrence that hasn't been acknowledged yet.
+    """
+    start, end = month_window(year, month)
+    tasks = {}
+    for scheduled_for, log_id, name, task, ack_by, rule_id in cached_query(
+            MONTH_TASKS_SQL, (start, end), tables=MONTH_TABLES):
+        tasks.setdefault(scheduled_for[:10], []).append((log_id, name, task, bool(ack_by), rule_id))
+    for o in occurrences_between(date.fromisoformat(start), date.fromisoformat(end)):
+        if o.log_id is None:
+            tasks.setdefault(o.due.isoformat(), []).append((None, o.equipment_name, o.task, False, o.rule_id))
+    return tasks
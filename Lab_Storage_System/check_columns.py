@@ -1,8 +1,8 @@
-import sqlite3
+from db import get_connection, close_all_connections
 
-conn = sqlite3.connect('storage.db')
+conn = get_connection()
 cursor = conn.cursor()
 cursor.execute("PRAGMA table_info(equipment)")
 for row in cursor.fetchall():
     print(row)
-conn.close()
+close_all_connections()
@@ -0,0 +1,90 @@
+# check_indexes.py
+# Runs EXPLAIN QUERY PLAN for the GUI's hot queries against a freshly migrated
+# scratch database and exits non-zero if any of them falls back to a full
+# table scan. Keep the SQL here in step with gui_launcher.py.
+import os
+import sys
+import tempfile
+
+import db
+from dashboard_stats import STATS_SQL
+from notification_feed import NEW_NOTIFICATIONS_SQL
+from migrations import migrate
+
+# (label, sql, sample params)
+HOT_QUERIES = [
+    ("view_maintenance_schedule", """
+        SELECT ml.id, eq.equipment_num, eq.name, ml.scheduled_for, ml.task, ml.acknowledged_by, ml.acknowledged_at
+        FROM maintenance_log ml
+        LEFT JOIN equipment eq ON ml.equipment_id = eq.id
+        WHERE ml.acknowledged_by IS NULL
+        ORDER BY ml.scheduled_for
+    """, ()),
+    # Paged views: a later page of each paged_model.KeysetTableModel query
+    ("view_maintenance_log", """
+        SELECT eq.equipment_num, eq.name, ml.task, ml.scheduled_by, ml.scheduled_at,
+               ml.acknowledged_by, ml.acknowledged_at, COALESCE(ml.scheduled_at, ''), ml.id
+        FROM maintenance_log ml LEFT JOIN equipment eq ON ml.equipment_id = eq.id
+        WHERE COALESCE(ml.scheduled_at, '') <= ? AND (COALESCE(ml.scheduled_at, ''), ml.id) < (?, ?)
+        ORDER BY COALESCE(ml.scheduled_at, '') DESC, ml.id DESC LIMIT ?
+    """, ("2024-01-01", "2024-01-01", 100, 100)),
+    ("view_equipment_list", """
+        SELECT equipment_num, name, next_maintenance, COALESCE(equipment_num, ''), id FROM equipment
+        WHERE COALESCE(equipment_num, '') >= ? AND (COALESCE(equipment_num, ''), id) > (?, ?)
+        ORDER BY COALESCE(equipment_num, ''), id LIMIT ?
+    """, ("EQ-100", "EQ-100", 100, 100)),
+    ("view_notifications", """
+        SELECT n.id, n.created_at, n.message, r.notification_id
+        FROM notification_recipients r JOIN notifications n ON n.id = r.notification_id
+        WHERE (r.user_id = ?) AND (r.notification_id) < (?)
+        ORDER BY r.notification_id DESC LIMIT ?
+    """, (3, 1000, 100)),
+    ("review_pending_test_reports", """
+        SELECT id, filename, uploaded_by, uploaded_at, id FROM engineer_reports
+        WHERE (approved = 0) AND (id) > (?)
+        ORDER BY id LIMIT ?
+    """, (100, 100)),
+    ("login",
+     "SELECT id, username, password_hash, role, logged_in FROM users WHERE username = ?", ("guest",)),
+    ("calendar_month", """
+        SELECT ml.scheduled_for, ml.id, eq.name, ml.task, ml.acknowledged_by, ml.rule_id
+        FROM maintenance_log ml
+        LEFT JOIN equipment eq ON ml.equipment_id = eq.id
+        WHERE ml.scheduled_for >= ? AND ml.scheduled_for < ?
+        ORDER BY ml.scheduled_for, ml.id
+    """, ("2024-05-25", "2024-07-13")),
+    ("browse_folder",
+     "SELECT name, type FROM files WHERE root = ? AND folder = ? ORDER BY name", ("uploaded_reports", "")),
+    ("dashboard_counters", STATS_SQL, ("2024-06-01",)),
+    ("notification_feed", NEW_NOTIFICATIONS_SQL, (3, 1000, 100)),
+    ("notification_retention",
+     "SELECT id FROM notifications WHERE user_role IS ? ORDER BY id DESC LIMIT 1 OFFSET ?", ("lab_engineer", 1000)),
+]
+
+
+def full_scans(conn, sql, params):
+    """Return the plan lines that scan a table without using any index, or sort in a temp b-tree."""
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [row[3] for row in plan
+            if (row[3].startswith("SCAN ") and " USING " not in row[3]) or row[3].startswith("USE TEMP B-TREE")]
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "plan_check.db")
+        migrate()
+        conn = db.get_connection()
+        for label, sql, params in HOT_QUERIES:
+            scans = full_scans(conn, sql, params)
+            if scans:
+                failures += 1
+                print(f"FAIL {label}: {'; '.join(scans)}")
+            else:
+                print(f"ok   {label}")
+        db.close_all_connections()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,13 @@
 import sqlite3
-import bcrypt
-import schedule
-import time
 from datetime import datetime, timedelta
-from threading import Thread
 from rich.console import Console
 from rich.prompt import Prompt, Confirm
 from getpass import getpass
-from db import db_query
+from db import db_query, transaction
+from migrations import migrate
+from recurrence import add_rule
+from security import verify_and_upgrade
+from reminders import start_reminders
 
 
 console = Console()
@@ -19,8 +19,12 @@ def login():
     password = getpass("Password: ")
     
     user = db_query('SELECT * FROM users WHERE username = ?', (username,), fetchone=True)
-    if user and bcrypt.checkpw(password.encode('utf-8'), user[2]):
-        return user  # (id, username, password_hash, role)
+    if user:
+        ok, new_hash = verify_and_upgrade(user[2], password)
+        if ok:
+            if new_hash is not None:
+                db_query('UPDATE users SET password_hash = ? WHERE id = ?', (new_hash, user[0]))
+            return user  # (id, username, password_hash, role)
     console.print("[bold red]Invalid credentials![/]")
     return None
 
@@ -74,31 +78,25 @@ def schedule_maintenance():
     next_date = datetime.now().date() + timedelta(days=interval)
     
     # Update database (critical fix: use selected_equipment_id)
-    db_query('''
-        UPDATE equipment 
-        SET last_maintenance=?, next_maintenance=?, maintenance_interval=?
-        WHERE id=?
-    ''', (datetime.now().date(), next_date, interval, selected_equipment_id))  # Fix here
+    with transaction():
+        db_query('''
+            UPDATE equipment 
+            SET last_maintenance=?, next_maintenance=?, maintenance_interval=?
+            WHERE id=?
+        ''', (datetime.now().date(), next_date, interval, selected_equipment_id))  # Fix here
+        # The interval repeats from next_date; it replaces the previous interval rule
+        db_query('''
+            UPDATE maintenance_rules SET active = 0
+            WHERE equipment_id = ? AND created_by IN ('cli', 'migration')
+        ''', (selected_equipment_id,))
+        add_rule(selected_equipment_id, None, str(interval), next_date, 'cli')
     
-    console.print(f"[green]Maintenance scheduled for {next_date}![/]")
+    console.print(f"[green]Maintenance scheduled for {next_date}, then every {interval} days![/]")
 
-# --- Scheduler Thread ---
-def check_reminders():
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
-
-def reminder_job():
-    overdue = db_query('''
-        SELECT name, next_maintenance 
-        FROM equipment 
-        WHERE next_maintenance <= DATE('now', '+3 days')
-    ''')
-    for name, date in overdue:
-        console.print(f"\n[bold yellow]REMINDER: {name} maintenance due on {date}[/]")
-
-schedule.every().day.at("09:00").do(reminder_job)
-Thread(target=check_reminders, daemon=True).start()
+# --- Reminders ---
+def reminder_job(reminders):
+    for reminder in reminders:
+        console.print(f"\n[bold yellow]REMINDER: {reminder.name} maintenance due on {reminder.due}[/]")
 
 # --- Menu System ---
 def admin_menu():
@@ -131,6 +129,8 @@ def user_menu():
 # --- Main App ---
 if __name__ == "__main__":
     console.print("[bold green]\n=== Lab Management System ===[/]")
+    migrate()
+    start_reminders(reminder_job)
     
     while True:
         user = login()
@@ -12,3 +12,16 @@ REPORT_DIRS = {
     'test_reports': 'test_reports',
     'specifications': 'specifications'
 }
+
+# bcrypt work factor for new and re-hashed passwords. Raising it only costs
+# login latency: older hashes are upgraded transparently on next login.
+BCRYPT_ROUNDS = 12
+
+# Notification retention: user_role -> (max age in days, max notifications
+# kept). Older or surplus ones are archived by notification_retention.py.
+# None covers notifications sent to everyone and any role not listed.
+NOTIFICATION_RETENTION = {
+    None: (180, 1000),
+    'material_lab_manager': (365, 5000),
+    'lab_engineer': (90, 1000),
+}
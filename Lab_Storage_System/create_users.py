@@ -1,24 +1,101 @@
+import argparse
+import csv
+import os
 import sqlite3
-import bcrypt
+import time
+from concurrent.futures import ProcessPoolExecutor
+from db import get_connection, db_execute_many, transaction
+from roles import PRIVILEGES
+from security import hash_password
+
+HASH_BATCH_SIZE = 256  # CSV rows read ahead and hashed at a time
+HASH_CHUNK_SIZE = 8    # passwords per task sent to a worker process
 
 def create_user(username, password, role):
     try:
-        conn = sqlite3.connect('storage.db')
+        conn = get_connection()
         cursor = conn.cursor()
 
         # Hash the password
-        hashed_pw = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        hashed_pw = hash_password(password)
 
         cursor.execute('INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)',
                        (username, hashed_pw, role))
 
         conn.commit()
-        conn.close()
         print(f"User '{username}' created successfully.")
     except sqlite3.Error as e:
         print(f"Error creating user: {e}")
 
+def _read_users(csv_path, existing, rejected):
+    """Stream valid (username, password, role) rows; invalid ones go to rejected."""
+    seen = set(existing)
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):  # line 1 is the header
+            username = (row.get('username') or '').strip()
+            password = row.get('password') or ''
+            role = (row.get('role') or '').strip()
+            if not username or not password:
+                rejected.append((line, username, "missing username or password"))
+            elif role not in PRIVILEGES:
+                rejected.append((line, username, f"unknown role '{role}'"))
+            elif username in seen:
+                rejected.append((line, username, "username already exists"))
+            else:
+                seen.add(username)
+                yield username, password, role
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def provision_from_csv(csv_path, workers=None):
+    """Create every user in a username,password,role CSV in one transaction.
+
+    Rows are streamed in batches and their passwords hashed across a process
+    pool (one process per core by default). Returns (created, rejected)
+    where rejected lists (line, username, reason).
+    """
+    start = time.perf_counter()
+    existing = {row[0] for row in get_connection().execute('SELECT username FROM users')}
+    rejected = []
+    users = []
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for batch in _batches(_read_users(csv_path, existing, rejected), HASH_BATCH_SIZE):
+            hashes = pool.map(hash_password, [password for _, password, _ in batch],
+                              chunksize=HASH_CHUNK_SIZE)
+            users.extend((username, hashed_pw, role)
+                         for (username, _, role), hashed_pw in zip(batch, hashes))
+
+    with transaction():
+        db_execute_many('INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)', users)
+
+    elapsed = time.perf_counter() - start
+    rate = len(users) / elapsed if elapsed > 0 else 0.0
+    print(f"Created {len(users)} user(s) in {elapsed:.1f}s ({rate:.1f} users/s); rejected {len(rejected)}.")
+    for line, username, reason in rejected:
+        print(f"  line {line}: {username or '<blank>'} - {reason}")
+    return len(users), rejected
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create lab system users.")
+    parser.add_argument('--csv', help="CSV file with username,password,role columns")
+    parser.add_argument('--workers', type=int, help="hashing processes (default: one per core)")
+    args = parser.parse_args()
+    if args.csv:
+        provision_from_csv(args.csv, args.workers)
+        raise SystemExit(0)
+
     # Example usage:
     create_user("Renata", "renata", "material_lab_manager")
     create_user("Wesley", "wespassword", "lab_engineer")
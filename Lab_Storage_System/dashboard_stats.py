@@ -0,0 +1,167 @@
+# dashboard_stats.py
+# Counters for the dashboard buttons without counting rows. Triggers on
+# maintenance_log, engineer_reports and equipment keep the single
+# dashboard_stats row (and a small keyed table) exact on every insert,
+# update and delete, so reading them costs the same however large those
+# tables grow:
+#   dashboard_stats      pending_tasks, pending_reports
+#   equipment_due_days   equipment per next_maintenance date; overdue is the
+#                        sum of the days before today, since "overdue"
+#                        changes with the date, not with a write
+# The notifications button shows the unread count from notification_feed.
+# Recurring rule occurrences are never stored, so pending_tasks adds the
+# number of pending ones (recurrence.pending_occurrences(), as the schedule
+# list shows them). That count is memoised per day with db.cached_call and
+# only recomputed after a write to maintenance_rules or maintenance_log, so
+# a counter refresh stays a single-row read.
+# python dashboard_stats.py checks the counters against full counts, and
+# --rebuild recomputes them.
+import sys
+from collections import namedtuple
+from datetime import date
+
+from db import cached_call, db_query, get_connection, transaction
+from recurrence import pending_occurrences
+
+# Writes to these tables move the counters (the triggers' targets are
+# written by SQLite itself, so db's commit listeners only see these)
+STATS_SOURCE_TABLES = frozenset({"maintenance_log", "maintenance_rules", "engineer_reports", "equipment"})
+
+PENDING_RULE_TABLES = ("maintenance_rules", "maintenance_log")
+
+DashboardCounts = namedtuple("DashboardCounts", "pending_tasks overdue_equipment pending_reports")
+
+STATS_SQL = '''
+    SELECT s.pending_tasks,
+           (SELECT COALESCE(SUM(n), 0) FROM equipment_due_days WHERE day < ?),
+           s.pending_reports
+    FROM dashboard_stats s WHERE s.id = 1
+'''
+
+# (name, SQL) pairs; created by migrations._dashboard_stats
+TRIGGERS = [
+    ("trg_stats_tasks_insert", '''AFTER INSERT ON maintenance_log WHEN NEW.acknowledged_by IS NULL BEGIN
+        UPDATE dashboard_stats SET pending_tasks = pending_tasks + 1 WHERE id = 1;
+    END'''),
+    ("trg_stats_tasks_delete", '''AFTER DELETE ON maintenance_log WHEN OLD.acknowledged_by IS NULL BEGIN
+        UPDATE dashboard_stats SET pending_tasks = pending_tasks - 1 WHERE id = 1;
+    END'''),
+    ("trg_stats_tasks_update", '''AFTER UPDATE OF acknowledged_by ON maintenance_log
+        WHEN (NEW.acknowledged_by IS NULL) != (OLD.acknowledged_by IS NULL) BEGIN
+        UPDATE dashboard_stats
+        SET pending_tasks = pending_tasks + (NEW.acknowledged_by IS NULL) - (OLD.acknowledged_by IS NULL)
+        WHERE id = 1;
+    END'''),
+
+    ("trg_stats_reports_insert", '''AFTER INSERT ON engineer_reports
+        WHEN COALESCE(NEW.approved, 0) = 0 AND COALESCE(NEW.rejected, 0) = 0 BEGIN
+        UPDATE dashboard_stats SET pending_reports = pending_reports + 1 WHERE id = 1;
+    END'''),
+    ("trg_stats_reports_delete", '''AFTER DELETE ON engineer_reports
+        WHEN COALESCE(OLD.approved, 0) = 0 AND COALESCE(OLD.rejected, 0) = 0 BEGIN
+        UPDATE dashboard_stats SET pending_reports = pending_reports - 1 WHERE id = 1;
+    END'''),
+    ("trg_stats_reports_update", '''AFTER UPDATE OF approved, rejected ON engineer_reports BEGIN
+        UPDATE dashboard_stats
+        SET pending_reports = pending_reports
+            + (COALESCE(NEW.approved, 0) = 0 AND COALESCE(NEW.rejected, 0) = 0)
+            - (COALESCE(OLD.approved, 0) = 0 AND COALESCE(OLD.rejected, 0) = 0)
+        WHERE id = 1;
+    END'''),
+
+    ("trg_stats_equipment_insert", '''AFTER INSERT ON equipment WHEN NEW.next_maintenance IS NOT NULL BEGIN
+        INSERT INTO equipment_due_days (day, n) VALUES (substr(NEW.next_maintenance, 1, 10), 1)
+        ON CONFLICT(day) DO UPDATE SET n = n + 1;
+    END'''),
+    ("trg_stats_equipment_delete", '''AFTER DELETE ON equipment WHEN OLD.next_maintenance IS NOT NULL BEGIN
+        UPDATE equipment_due_days SET n = n - 1 WHERE day = substr(OLD.next_maintenance, 1, 10);
+        DELETE FROM equipment_due_days WHERE day = substr(OLD.next_maintenance, 1, 10) AND n <= 0;
+    END'''),
+    ("trg_stats_equipment_update", '''AFTER UPDATE OF next_maintenance ON equipment
+        WHEN NEW.next_maintenance IS NOT OLD.next_maintenance BEGIN
+        UPDATE equipment_due_days SET n = n - 1
+        WHERE OLD.next_maintenance IS NOT NULL AND day = substr(OLD.next_maintenance, 1, 10);
+        DELETE FROM equipment_due_days
+        WHERE OLD.next_maintenance IS NOT NULL AND day = substr(OLD.next_maintenance, 1, 10) AND n <= 0;
+        INSERT INTO equipment_due_days (day, n)
+        SELECT substr(NEW.next_maintenance, 1, 10), 1 WHERE NEW.next_maintenance IS NOT NULL
+        ON CONFLICT(day) DO UPDATE SET n = n + 1;
+    END'''),
+]
+
+
+def create_stats(conn):
+    """Create the counter tables and their triggers, then fill them from the current rows."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS dashboard_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        pending_tasks INTEGER NOT NULL DEFAULT 0,
+        pending_reports INTEGER NOT NULL DEFAULT 0
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS equipment_due_days (
+        day TEXT PRIMARY KEY,
+        n INTEGER NOT NULL
+    ) WITHOUT ROWID''')
+    for name, body in TRIGGERS:
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    rebuild_stats(conn)
+
+
+def rebuild_stats(conn):
+    """Recompute every counter with full counts (setup and repair only)."""
+    conn.execute("INSERT OR IGNORE INTO dashboard_stats (id) VALUES (1)")
+    conn.execute('''UPDATE dashboard_stats SET
+        pending_tasks = (SELECT COUNT(*) FROM maintenance_log WHERE acknowledged_by IS NULL),
+        pending_reports = (SELECT COUNT(*) FROM engineer_reports
+                           WHERE COALESCE(approved, 0) = 0 AND COALESCE(rejected, 0) = 0)
+        WHERE id = 1''')
+    conn.execute("DELETE FROM equipment_due_days")
+    conn.execute('''INSERT INTO equipment_due_days (day, n)
+                    SELECT substr(next_maintenance, 1, 10), COUNT(*) FROM equipment
+                    WHERE next_maintenance IS NOT NULL GROUP BY 1''')
+
+
+def pending_rule_tasks(today):
+    """Number of pending recurring occurrences on the schedule list, cached until the rules or log change."""
+    return cached_call(("pending_rule_tasks", today.isoformat()),
+                       lambda: len(pending_occurrences(today)), PENDING_RULE_TABLES)
+
+
+def dashboard_counts(today=None):
+    """DashboardCounts from the counter tables."""
+    today = today or date.today()
+    row = db_query(STATS_SQL, (today.isoformat(),), fetchone=True)
+    counts = DashboardCounts(*row) if row else DashboardCounts(0, 0, 0)
+    return counts._replace(pending_tasks=counts.pending_tasks + pending_rule_tasks(today))
+
+
+def stale_counters(conn):
+    """[(counter, stored, actual)] for every counter that disagrees with a full count."""
+    today = date.today().isoformat()
+    stored = conn.execute("SELECT pending_tasks, pending_reports FROM dashboard_stats WHERE id = 1").fetchone()
+    actual = conn.execute('''SELECT
+        (SELECT COUNT(*) FROM maintenance_log WHERE acknowledged_by IS NULL),
+        (SELECT COUNT(*) FROM engineer_reports WHERE COALESCE(approved, 0) = 0 AND COALESCE(rejected, 0) = 0)
+    ''').fetchone()
+    stale = [(name, s, a) for name, s, a in zip(("pending_tasks", "pending_reports"), stored or (None, None), actual)
+             if s != a]
+    overdue = conn.execute("SELECT COALESCE(SUM(n), 0) FROM equipment_due_days WHERE day < ?", (today,)).fetchone()[0]
+    actual_overdue = conn.execute(
+        "SELECT COUNT(*) FROM equipment WHERE substr(next_maintenance, 1, 10) < ?", (today,)).fetchone()[0]
+    if overdue != actual_overdue:
+        stale.append(("overdue_equipment", overdue, actual_overdue))
+    return stale
+
+
+if __name__ == "__main__":
+    from migrations import migrate
+    migrate()
+    conn = get_connection()
+    if "--rebuild" in sys.argv:
+        with transaction():
+            rebuild_stats(conn)
+    stale = stale_counters(conn)
+    for name, stored, actual in stale:
+        print(f"STALE {name}: stored {stored}, actual {actual}")
+    if stale:
+        raise SystemExit("Counters are out of date; run with --rebuild")
+    print("Dashboard counters match the tables.")
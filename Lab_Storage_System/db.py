@@ -1,50 +1,345 @@
 # db.py
+import re
 import sqlite3
-from PySide6.QtWidgets import QMessageBox
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 
 DB_NAME = "storage.db"
 
+# Applied once to every pooled connection when it is opened
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),      # negative = KiB, so ~16 MB page cache
+    ("mmap_size", 268435456),    # 256 MB memory-mapped reads
+    ("busy_timeout", 5000),      # ms to wait on a locked database
+)
+STATEMENT_CACHE_SIZE = 256
+
+# Read cache limits (see cached_query)
+CACHE_MAX_ENTRIES = 256
+CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+_local = threading.local()
+_pool = []
+_pool_lock = threading.Lock()
+
+_WRITE_RE = re.compile(
+    r"^\s*(?:INSERT|REPLACE|UPDATE|DELETE)\s+(?:OR\s+\w+\s+)?(?:INTO\s+|FROM\s+)?[\"\[`]?(\w+)",
+    re.IGNORECASE,
+)
+_DDL_RE = re.compile(r"^\s*(?:CREATE|ALTER|DROP)\b", re.IGNORECASE)
+
+_commit_listeners = []      # see add_commit_listener()
+_cache = OrderedDict()      # key -> (result, generations, size)
+_cache_bytes = 0
+_cache_lock = threading.RLock()
+_table_generations = {}     # table -> bumped on every local write
+_global_generation = 0      # bumped on DDL or when another connection has committed
+
+
+def get_connection():
+    """Return this thread's long-lived connection to DB_NAME, opening it on first use."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(DB_NAME)
+    if conn is None:
+        conn = sqlite3.connect(
+            DB_NAME,
+            timeout=5.0,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False,  # only so close_all_connections() can run at shutdown
+        )
+        for name, value in PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        conns[DB_NAME] = conn
+        with _pool_lock:
+            _pool.append(conn)
+    return conn
+
+
+def close_connection():
+    """Close the calling thread's pooled connections."""
+    conns = getattr(_local, "conns", None) or {}
+    for conn in conns.values():
+        with _pool_lock:
+            if conn in _pool:
+                _pool.remove(conn)
+        conn.close()
+    conns.clear()
+    getattr(_local, "data_versions", {}).clear()
+
+
+def close_all_connections():
+    """Close every pooled connection (call once at application shutdown)."""
+    with _pool_lock:
+        conns = list(_pool)
+        _pool.clear()
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    conns = getattr(_local, "conns", None)
+    if conns is not None:
+        conns.clear()
+
+
+def _estimate_size(result):
+    if result is None:
+        return 16
+    if isinstance(result, (int, float)):
+        return sys.getsizeof(result)
+    if isinstance(result, tuple):
+        return sys.getsizeof(result) + sum(sys.getsizeof(value) for value in result)
+    return sys.getsizeof(result) + sum(_estimate_size(row) for row in result)
+
+
+def invalidate_cache(*tables):
+    """Drop cached reads of the given tables, or of everything if none are given."""
+    global _global_generation
+    with _cache_lock:
+        if tables:
+            for table in tables:
+                table = table.lower()
+                _table_generations[table] = _table_generations.get(table, 0) + 1
+        else:
+            _global_generation += 1
+
+
+def _note_write(query):
+    """Invalidate cached reads of the table query writes to; returns that table or None."""
+    match = _WRITE_RE.match(query)
+    if match:
+        table = match.group(1).lower()
+        invalidate_cache(table)
+        tx_tables = getattr(_local, "tx_tables", None)
+        if tx_tables is not None:
+            tx_tables.add(table)
+        return table
+    elif _DDL_RE.match(query):
+        invalidate_cache()
+    return None
+
+
+def add_commit_listener(callback):
+    """Call callback(tables) after every local commit that wrote to the given (lower-case) tables.
+
+    Runs on the committing thread, so callbacks must be quick and thread-safe.
+    """
+    _commit_listeners.append(callback)
+
+
+def remove_commit_listener(callback):
+    if callback in _commit_listeners:
+        _commit_listeners.remove(callback)
+
+
+def _notify_commit(tables):
+    tables = frozenset(t for t in tables if t)
+    if not tables:
+        return
+    for callback in list(_commit_listeners):
+        try:
+            callback(tables)
+        except Exception as e:
+            print(f"Commit listener failed: {e}")
+
+
+def _check_data_version(conn):
+    """PRAGMA data_version only moves when *another* connection commits, so a
+    change means some other client or thread wrote and we can't tell what."""
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    seen = getattr(_local, "data_versions", None)
+    if seen is None:
+        seen = _local.data_versions = {}
+    # A connection seen for the first time has no baseline, so it can't vouch
+    # for entries cached by other threads either
+    if seen.get(conn) != version:
+        invalidate_cache()
+        seen[conn] = version
+
+
+def data_version():
+    """PRAGMA data_version of this thread's connection; it changes when any other connection commits."""
+    return get_connection().execute("PRAGMA data_version").fetchone()[0]
+
+
+def _generations(tables):
+    return (_global_generation,) + tuple(_table_generations.get(t, 0) for t in tables)
+
+
+def _memoise(conn, key, tables, compute):
+    global _cache_bytes
+    tables = tuple(t.lower() for t in tables)
+    _check_data_version(conn)
+    with _cache_lock:
+        generations = _generations(tables)
+        entry = _cache.get(key)
+        if entry is not None and entry[1] == generations:
+            _cache.move_to_end(key)
+            return entry[0]
+
+    result = compute()
+
+    size = _estimate_size(result)
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _cache_bytes -= old[2]
+        # Only cache if nothing was written while we were reading
+        if size <= CACHE_MAX_BYTES and _generations(tables) == generations:
+            _cache[key] = (result, generations, size)
+            _cache_bytes += size
+            while len(_cache) > CACHE_MAX_ENTRIES or _cache_bytes > CACHE_MAX_BYTES:
+                _, evicted = _cache.popitem(last=False)
+                _cache_bytes -= evicted[2]
+    return result
+
+
+def cached_read(conn, query, params, fetchone, tables):
+    """cached_query without the error handling; sqlite3.Error propagates."""
+    def read():
+        cursor = conn.execute(query, params)
+        return cursor.fetchone() if fetchone else cursor.fetchall()
+    return _memoise(conn, (DB_NAME, query, tuple(params), fetchone), tables, read)
+
+
+def cached_call(key, compute, tables):
+    """Memoise compute()'s result the way cached_query memoises a read.
+
+    key (hashable) names the result; tables must list every table compute()
+    reads. sqlite3.Error propagates.
+    """
+    return _memoise(get_connection(), (DB_NAME, "call", key), tables, compute)
+
+
+def cached_query(query, params=(), tables=(), fetchone=False):
+    """Memoised read-only db_query.
+
+    tables must list every table the query reads. Entries are invalidated by
+    local writes to those tables (tracked by db_query/db_execute_many) and by
+    any commit from another connection (PRAGMA data_version). Callers must
+    not mutate the returned rows.
+    """
+    try:
+        return cached_read(get_connection(), query, params, fetchone, tables)
+    except sqlite3.Error as e:
+        print(f"Database Error: {e}")
+        return []
+
+
+def _in_transaction():
+    return getattr(_local, "tx_depth", 0) > 0
+
+
+@contextmanager
+def transaction():
+    """Group db_query/db_execute_many calls into one atomic commit.
+
+    Inside the block errors are raised instead of swallowed so the whole
+    unit of work rolls back. Nested blocks join the outermost transaction.
+    """
+    conn = get_connection()
+    depth = getattr(_local, "tx_depth", 0)
+    if depth == 0:
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        _local.tx_tables = set()
+    _local.tx_depth = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        _local.tx_depth = depth
+        if depth == 0:
+            conn.rollback()
+        raise
+    else:
+        _local.tx_depth = depth
+        if depth == 0:
+            conn.commit()
+            _notify_commit(_local.tx_tables)
+    finally:
+        if depth == 0:
+            # Reads cached mid-transaction may hold rolled back or uncommitted rows
+            invalidate_cache(*_local.tx_tables)
+            _local.tx_tables = None
+
+
+def _commit_write(conn, query):
+    """Commit query's write unless a transaction is open, then invalidate and notify.
+
+    Invalidating only after the commit keeps another thread from caching the
+    pre-commit rows under the new generation; inside a transaction,
+    transaction() invalidates the written tables again once it commits.
+    """
+    if _in_transaction():
+        _note_write(query)
+        return
+    conn.commit()
+    _notify_commit((_note_write(query),))
+
+
 def db_query(query, params=(), fetchone=False):
+    conn = None
     try:
-        conn = sqlite3.connect('storage.db')
-        cursor = conn.cursor()
-        cursor.execute(query, params)
+        conn = get_connection()
+        cursor = conn.execute(query, params)
         result = cursor.fetchone() if fetchone else cursor.fetchall()
-        conn.commit()
+        _commit_write(conn, query)
         return result
     except sqlite3.Error as e:
+        if _in_transaction():
+            raise
+        if conn is not None:
+            conn.rollback()
         print(f"Database Error: {e}")
         return []  # ← this is the important fix!
-    finally:
-        conn.close()
+
+
+def db_execute_many(query, seq_of_params):
+    """Run one statement for every parameter tuple via executemany; returns the row count."""
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.executemany(query, seq_of_params)
+        _commit_write(conn, query)
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        if _in_transaction():
+            raise
+        if conn is not None:
+            conn.rollback()
+        print(f"Database Error: {e}")
+        return 0
 
 
 def execute_sql(sql_command):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute(sql_command)
+        conn = get_connection()
+        conn.execute(sql_command)
+        table = _note_write(sql_command)
         conn.commit()
-        conn.close()
+        _notify_commit((table,))
     except sqlite3.Error as e:
         _show_error(f"SQL Error: {e}")
 
 def check_and_add_column():
+    # Kept for older callers; the migration engine owns schema changes now
+    from migrations import migrate
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(equipment)")
-        columns = cursor.fetchall()
-        column_names = [column[1] for column in columns]
-
-        if "equipment_num" not in column_names:
-            execute_sql('ALTER TABLE equipment ADD COLUMN equipment_num TEXT;')
+        migrate()
     except sqlite3.Error as e:
         _show_error(f"SQL Error: {e}")
 
 def _show_error(message):
     try:
         # Try using QMessageBox for GUI
+        from PySide6.QtWidgets import QMessageBox
         QMessageBox.critical(None, "Database Error", message)
     except Exception:
         # Fallback for CLI
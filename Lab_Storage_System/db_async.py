@@ -0,0 +1,108 @@
+# db_async.py
+# Runs read queries on a QThreadPool so slow or locked databases (e.g. a
+# shared storage.db on a network drive) don't freeze the Qt main thread.
+# Each worker thread uses its own pooled connection from db.get_connection().
+import sqlite3
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from db import get_connection, cached_read
+
+DB_WORKER_THREADS = 2
+
+_pool = None
+_active = set()  # tasks in flight, kept referenced until their signals are delivered
+
+
+def thread_pool():
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(DB_WORKER_THREADS)
+    return _pool
+
+
+class QuerySignals(QObject):
+    result = Signal(object)
+    error = Signal(str)
+    done = Signal()
+
+
+class QueryTask(QRunnable):
+    """One query executed off the GUI thread; results arrive via queued signals."""
+
+    def __init__(self, query, params=(), fetchone=False, tables=()):
+        super().__init__()
+        self.query = query
+        self.params = params
+        self.fetchone = fetchone
+        self.tables = tables  # non-empty => served through db's read cache
+        self.signals = QuerySignals()
+        self._cancelled = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def cancel(self, *_args):
+        """Drop the result and interrupt the statement if it is still running."""
+        with self._lock:
+            self._cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            self.signals.done.emit()
+
+    def _run(self):
+        if self._cancelled:
+            return
+        try:
+            conn = get_connection()
+            with self._lock:
+                self._conn = conn
+            if self.tables:
+                rows = cached_read(conn, self.query, self.params, self.fetchone, self.tables)
+            else:
+                cursor = conn.execute(self.query, self.params)
+                rows = cursor.fetchone() if self.fetchone else cursor.fetchall()
+        except sqlite3.Error as e:
+            if not self._cancelled:
+                self.signals.error.emit(str(e))
+            return
+        finally:
+            with self._lock:
+                self._conn = None
+        if not self._cancelled:
+            self.signals.result.emit(rows)
+
+
+def _print_error(message):
+    print(f"Database Error: {message}")
+
+
+def run_query(query, params=(), on_result=None, on_error=_print_error, owner=None, fetchone=False, tables=()):
+    """Queue a read query and deliver its rows to on_result on the GUI thread.
+
+    If owner is a dialog, the task is cancelled when the dialog finishes so a
+    late result never touches widgets that are gone. Passing the tables the
+    query reads lets repeat opens be answered from db.cached_query's cache.
+    """
+    task = QueryTask(query, params, fetchone, tables)
+    if on_result is not None:
+        task.signals.result.connect(on_result)
+    if on_error is not None:
+        task.signals.error.connect(on_error)
+    if owner is not None:
+        closed = getattr(owner, "finished", None) or owner.destroyed
+        closed.connect(task.cancel)
+    task.signals.done.connect(lambda: _active.discard(task))
+    task.setAutoDelete(False)
+    _active.add(task)
+    thread_pool().start(task)
+    return task
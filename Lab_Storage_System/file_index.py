@@ -0,0 +1,274 @@
+# file_index.py
+# Keeps the files table in step with the report/procedure trees so the
+# browser dialogs read folder contents from SQLite instead of listing
+# (possibly network) directories every time one opens.
+# refresh() is an incremental rescan: a directory is only re-listed when its
+# mtime changed since it was last listed, which happens whenever an entry is
+# added, removed or renamed in it. Editing a file in place doesn't touch the
+# directory, so the known files of an unchanged directory are only stat'ed
+# (a stat each, no listing) for the folder a dialog has open, and everywhere
+# on every FILE_STAT_PASSES-th background pass.
+# The app's own writes call record()/forget() so they show up at once, and
+# FileIndexer re-runs refresh() on every root in the background to pick up
+# changes made by other machines on the share.
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+
+from db import cached_query, db_execute_many, get_connection, transaction
+
+INDEXED_ROOTS = ("uploaded_reports", "uploaded_procedures", os.path.join("engineer_reports", "approved"))
+RESCAN_INTERVAL = 30.0  # seconds between background rescans
+FILE_STAT_PASSES = 20   # every this many rescans also stat files in unchanged folders (~10 min)
+
+_UPSERT = '''INSERT INTO files (path, root, folder, name, is_dir, size, mtime, type)
+             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+             ON CONFLICT(path) DO UPDATE SET root = excluded.root, folder = excluded.folder,
+                 name = excluded.name, is_dir = excluded.is_dir, size = excluded.size,
+                 mtime = excluded.mtime, type = excluded.type'''
+
+_refresh_lock = threading.Lock()
+
+
+def _key(path):
+    return os.path.normpath(path)
+
+
+def _locate(path):
+    """(root, folder) of an indexed path; folder is None for a root, root is None outside the trees."""
+    key = _key(path)
+    for root in INDEXED_ROOTS:
+        if key == root:
+            return root, None
+        if key.startswith(root + os.sep):
+            return root, _folder_of(root, os.path.dirname(key))
+    return None, None
+
+
+def _folder_of(root, directory):
+    """Folder value for entries inside directory ('' for the root itself)."""
+    return "" if directory == root else os.path.relpath(directory, root)
+
+
+def _row(key, root, folder, is_dir, size, mtime):
+    name = os.path.basename(key)
+    kind = "dir" if is_dir else os.path.splitext(name)[1].lower().lstrip(".")
+    return (key, root, folder, name, 1 if is_dir else 0, size, mtime, kind)
+
+
+def refresh(root, folder=None, stat_files=False):
+    """Bring root's rows up to date with the disk; returns the number of rows changed.
+
+    Files in an unchanged directory are only stat'ed if it is folder (a path)
+    or stat_files is set; otherwise in-place edits wait for a later pass.
+    """
+    root = _key(root)
+    open_folder = _key(folder) if folder is not None else None
+    with _refresh_lock:
+        known = {}
+        children = defaultdict(list)
+        for path, folder, is_dir, size, mtime in get_connection().execute(
+                "SELECT path, folder, is_dir, size, mtime FROM files WHERE root = ?", (root,)):
+            known[path] = (is_dir, size, mtime)
+            if folder is not None:
+                children[_key(os.path.join(root, folder))].append(path)
+
+        upserts = []
+        seen = set()
+        pending = [root]
+        while pending:
+            directory = pending.pop()
+            try:
+                st = os.stat(directory)
+            except FileNotFoundError:
+                continue
+            seen.add(directory)
+            old = known.get(directory)
+            if old is None or not old[0] or old[2] != st.st_mtime:
+                try:
+                    with os.scandir(directory) as entries:
+                        listing = list(entries)
+                except OSError as e:
+                    print(f"[INDEX ERROR] Could not list {directory}: {e}")
+                    listing = None
+            else:
+                listing = None  # nothing added or removed here since the last listing
+
+            if listing is None:
+                stat_here = stat_files or directory == open_folder
+                for child in children[directory]:
+                    if known[child][0]:
+                        seen.add(child)
+                        pending.append(child)
+                        continue
+                    if not stat_here:
+                        seen.add(child)
+                        continue
+                    try:
+                        est = os.stat(child)
+                    except FileNotFoundError:
+                        continue
+                    seen.add(child)
+                    if known[child] != (0, est.st_size, est.st_mtime):
+                        upserts.append(_row(child, root, _folder_of(root, directory), False,
+                                            est.st_size, est.st_mtime))
+                continue
+
+            upserts.append(_row(directory, root, _locate(directory)[1], True, None, st.st_mtime))
+            entry_folder = _folder_of(root, directory)
+            for entry in listing:
+                key = _key(entry.path)
+                try:
+                    if entry.is_dir():
+                        pending.append(key)  # its row is written once it has been listed
+                        continue
+                    est = entry.stat()
+                except FileNotFoundError:
+                    continue
+                seen.add(key)
+                if known.get(key) != (0, est.st_size, est.st_mtime):
+                    upserts.append(_row(key, root, entry_folder, False, est.st_size, est.st_mtime))
+
+        gone = [(path,) for path in known if path not in seen]
+        if upserts or gone:
+            with transaction():
+                if upserts:
+                    db_execute_many(_UPSERT, upserts)
+                if gone:
+                    db_execute_many("DELETE FROM files WHERE path = ?", gone)
+        return len(upserts) + len(gone)
+
+
+def refresh_all(stat_files=False):
+    changed = 0
+    for root in INDEXED_ROOTS:
+        try:
+            changed += refresh(root, stat_files=stat_files)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[INDEX ERROR] Rescan of {root} failed: {e}")
+    return changed
+
+
+def record(path):
+    """Index path (and any parent folders not yet indexed) right after the app writes it."""
+    root, folder = _locate(path)
+    if root is None or folder is None:
+        return
+    key = _key(path)
+    try:
+        st = os.stat(key)
+    except FileNotFoundError:
+        forget(key)
+        return
+    is_dir = os.path.isdir(key)
+    # Directories get mtime 0 so the next refresh() lists them
+    rows = [_row(key, root, folder, is_dir, None if is_dir else st.st_size, 0.0 if is_dir else st.st_mtime)]
+    parents = []
+    parent = os.path.dirname(key)
+    while parent != root:
+        parents.append(_row(parent, root, _locate(parent)[1], True, None, 0.0))
+        parent = os.path.dirname(parent)
+    with transaction():
+        if parents:
+            db_execute_many('''INSERT OR IGNORE INTO files (path, root, folder, name, is_dir, size, mtime, type)
+                               VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', parents)
+        db_execute_many(_UPSERT, rows)
+
+
+def forget(path):
+    """Drop path, and everything under it if it was a folder, from the index."""
+    key = _key(path)
+    if _locate(key)[0] is None:
+        return
+    # Range over the primary key instead of LIKE, which would treat _ and % in names as wildcards
+    db_execute_many("DELETE FROM files WHERE path = ? OR (path > ? AND path < ?)",
+                    [(key, key + os.sep, key + chr(ord(os.sep) + 1))])
+
+
+def _ensure_indexed(root):
+    if not cached_query("SELECT 1 FROM files WHERE path = ?", (root,), tables=("files",)):
+        refresh(root)  # first run only: one full listing
+
+
+def list_dir(path, extensions=None):
+    """Sorted names in path from the index, optionally only files with the given extensions."""
+    root, _ = _locate(path)
+    if root is None:
+        return sorted(os.listdir(path)) if os.path.isdir(path) else []
+    _ensure_indexed(root)
+    rows = cached_query("SELECT name, type FROM files WHERE root = ? AND folder = ? ORDER BY name",
+                        (root, _folder_of(root, _key(path))), tables=("files",))
+    if extensions:
+        wanted = {ext.lower().lstrip(".") for ext in extensions}
+        return [name for name, kind in rows if kind in wanted]
+    return [name for name, _ in rows]
+
+
+def list_subfolders(path):
+    """Sorted folder names directly in path, from the index."""
+    root, _ = _locate(path)
+    if root is None:
+        return sorted(f for f in os.listdir(path) if os.path.isdir(os.path.join(path, f)))
+    _ensure_indexed(root)
+    rows = cached_query("SELECT name FROM files WHERE root = ? AND folder = ? AND is_dir = 1 ORDER BY name",
+                        (root, _folder_of(root, _key(path))), tables=("files",))
+    return [name for name, in rows]
+
+
+class FileIndexer(threading.Thread):
+    """Background thread that rescans every indexed root every RESCAN_INTERVAL seconds.
+
+    after_refresh, if given, is called after the first pass and after any
+    pass that changed the index.
+    """
+
+    def __init__(self, interval=RESCAN_INTERVAL, after_refresh=None):
+        super().__init__(name="file-indexer", daemon=True)
+        self.interval = interval
+        self.after_refresh = after_refresh
+        self._stop_event = threading.Event()
+
+    def run(self):
+        first = True
+        passes = 0
+        while not self._stop_event.is_set():
+            changed = refresh_all(stat_files=passes % FILE_STAT_PASSES == 0)
+            passes += 1
+            if self.after_refresh is not None and (changed or first):
+                try:
+                    self.after_refresh()
+                except (OSError, sqlite3.Error) as e:
+                    print(f"[INDEX ERROR] Post-rescan hook failed: {e}")
+            first = False
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_indexer = None
+
+
+def start_file_indexer(after_refresh=None):
+    global _indexer
+    if _indexer is None or not _indexer.is_alive():
+        _indexer = FileIndexer(after_refresh=after_refresh)
+        _indexer.start()
+    return _indexer
+
+
+def stop_file_indexer():
+    global _indexer
+    indexer, _indexer = _indexer, None
+    if indexer is not None:
+        indexer.stop()
+        indexer.join(timeout=RESCAN_INTERVAL)
+
+
+if __name__ == "__main__":
+    from migrations import migrate
+    migrate()
+    for root in INDEXED_ROOTS:
+        os.makedirs(root, exist_ok=True)
+    print(f"Index updated: {refresh_all()} row(s) changed.")
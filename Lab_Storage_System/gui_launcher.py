@@ -1,126 +1,80 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-import shutil
 import webbrowser
-from PySide6.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QMessageBox, QListWidget, QListWidgetItem, QDialog, QCalendarWidget, QLineEdit, QDateEdit, QDoubleSpinBox, QCheckBox, QComboBox, QHBoxLayout, QInputDialog
-from PySide6.QtCore import Qt, QDate, QTimer
+from PySide6.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QMessageBox, QListWidget, QListWidgetItem, QDialog, QCalendarWidget, QLineEdit, QDateEdit, QDoubleSpinBox, QSpinBox, QCheckBox, QComboBox, QHBoxLayout, QInputDialog, QProgressBar, QTableView, QAbstractItemView
+from PySide6.QtCore import Qt, QDate, QTimer, QObject, Signal
 from PySide6.QtGui import QTextCharFormat, QCursor
 import sqlite3
-import bcrypt
-from threading import Thread
 import time
-import schedule
 from datetime import datetime
 import platform
 import subprocess
 from config import ROLE_DISPLAY_NAMES, REPORT_DIRS
-from db import db_query, execute_sql, check_and_add_column
-from security import validate_pdf, secure_file_path, verify_password
+from db import db_query, execute_sql, check_and_add_column, close_all_connections, transaction, cached_query, add_commit_listener, remove_commit_listener, data_version
+from security import validate_pdf, secure_file_path, verify_and_upgrade
 from auth import require_permission
 from roles import has_permission
-from audit import AuditLogger
-
-# --- Scheduler functions ---
-def run_scheduler():
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
-
-def show_maintenance_alert():
-    overdue = db_query('''
-        SELECT name, next_maintenance 
-        FROM equipment 
-        WHERE next_maintenance <= DATE('now', '+3 days')
-    ''')
-    if overdue:
-        message = "Pending Maintenance:\n" + "\n".join([f"- {name} ({date})" for name, date in overdue])
-        QMessageBox.warning(None, "Maintenance Due", message)
-
-# --- Create DB tables ---
-create_tables_sql = [
-    '''CREATE TABLE IF NOT EXISTS maintenance_log (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        equipment_id INTEGER,
-        task TEXT,
-        scheduled_by TEXT,
-        scheduled_at TEXT,
-        acknowledged_by TEXT,
-        acknowledged_at TEXT,
-        FOREIGN KEY (equipment_id) REFERENCES equipment(id)
-    )''',
-    '''CREATE TABLE IF NOT EXISTS engineer_reports (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        filename TEXT NOT NULL,
-        uploaded_by TEXT NOT NULL,
-        uploaded_at TEXT NOT NULL,
-        approved INTEGER DEFAULT 0  -- 0 = pending, 1 = approved
-    )''',
-    '''CREATE TABLE IF NOT EXISTS equipment (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        next_maintenance DATE,
-        equipment_num TEXT,
-        description TEXT,
-        completed INTEGER DEFAULT 0
-    )''',
-    '''CREATE TABLE IF NOT EXISTS quotations (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        customer TEXT NOT NULL,
-        service TEXT NOT NULL,
-        price REAL NOT NULL,
-        date DATE NOT NULL
-    )''',
-    '''CREATE TABLE IF NOT EXISTS specifications (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        equipment_id INTEGER NOT NULL,
-        report_path TEXT NOT NULL
-    )''',
-    '''CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL,
-        password_hash TEXT NOT NULL,
-        role TEXT NOT NULL
-    )''',
-    '''CREATE TABLE IF NOT EXISTS procedures (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        file_path TEXT NOT NULL,
-        upload_date DATE NOT NULL
-    )''',
-    '''CREATE TABLE IF NOT EXISTS notifications (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    message TEXT NOT NULL,
-    user_role TEXT,  -- null = visible to all
-    created_at TEXT NOT NULL
-    )'''
-]
-for sql in create_tables_sql:
-    db_query(sql)
-
-try:
-    db_query("ALTER TABLE users ADD COLUMN logged_in INTEGER DEFAULT 0")
-except Exception:
-    pass  # Column already exists
-
-try:
-    db_query("ALTER TABLE engineer_reports ADD COLUMN rejected INTEGER DEFAULT 0")
-except Exception:
-    pass  # Already exists
-try:
-    db_query("ALTER TABLE maintenance_log ADD COLUMN scheduled_for TEXT")
-except Exception:
-    pass  # Already exists
-
-# --- Start scheduler thread ---
-schedule.every().day.at("09:00").do(show_maintenance_alert)
-Thread(target=run_scheduler, daemon=True).start()
+from audit import AuditLogger, flush_audit_log, shutdown_audit_writer
+from migrations import migrate
+from db_async import run_query
+from paged_model import KeysetTableModel
+from calendar_months import MONTH_TASKS_SQL, MONTH_TABLES, adjacent_months, month_tasks, month_window
+from dashboard_stats import STATS_SOURCE_TABLES, dashboard_counts
+from notification_feed import FEED_BATCH, badge_text, mark_read, new_notifications, newest_id, read_cursor, unread_count
+from notification_retention import start_notification_retention, stop_notification_retention
+from report_review import APPROVED_ROOT, approve_reports, move_reports, reject_reports
+from bulk_schedule import import_schedule, schedule_entries, summary as schedule_summary
+from recurrence import acknowledge_occurrence, add_rule, describe_rule, end_rule, pending_occurrences
+from workers import run_in_background
+from uploads import run_upload, UploadLogRecorder
+from blob_store import delete_stored_file
+from storage_io import copy_file
+from text_search import PDF_TEXT_MISSING, index_documents, pdf_text_available, search as search_text, shutdown_text_indexer, sync_documents
+from reminders import format_reminders, start_reminders, stop_reminders
+from file_index import list_dir, list_subfolders, record as index_file, refresh as refresh_file_index, start_file_indexer, stop_file_indexer
+
+# --- Maintenance reminders ---
+class ReminderNotifier(QObject):
+    """Carries reminders from the reminder thread to the GUI thread."""
+    due = Signal(object)
+
+def show_maintenance_alert(reminders):
+    message = "Pending Maintenance:\n" + format_reminders(reminders)
+    QMessageBox.warning(None, "Maintenance Due", message)
+
+# --- Startup ---
+# Only called from __main__: the text extraction worker processes re-import
+# this module and must not run any of this.
+def start_services():
+    # Create / upgrade DB tables
+    migrate()
+
+    # Keep the report/procedure folder index, and the search index built on it, current
+    start_file_indexer(after_refresh=sync_documents)
+
+    # Archive notifications past their role's retention limits, daily
+    start_notification_retention()
 
 # --- Main Application Class ---
+# Dashboard buttons that show a counter: handler name -> dashboard_counts() field
+BUTTON_COUNTERS = {
+    "view_maintenance_schedule": "pending_tasks",
+    "view_equipment_list": "overdue_equipment",
+    "review_pending_test_reports": "pending_reports",
+}
+NOTIFICATION_POLL_MS = 2000  # PRAGMA data_version check; rows are only read when it moves
+
 class MainApplication(QMainWindow):
+    counters_changed = Signal()
+    notifications_changed = Signal()
+
     def __init__(self, user):
         super().__init__()
         self.user = user
+        self.counter_buttons = []  # (button, label, counter)
+        self.notifications_button = None  # (button, label)
+        self.audit = AuditLogger(user[0])
         self.setWindowTitle(f"Welcome {user[1]}")
         self.setMinimumSize(600, 400)
         layout = QVBoxLayout()
@@ -136,8 +90,6 @@ class MainApplication(QMainWindow):
         layout.addWidget(label)
 
         from PySide6.QtWidgets import QGridLayout, QCalendarWidget
-        from PySide6.QtGui import QTextCharFormat
-        from PySide6.QtCore import QDate
 
 
         if user[3] == 'material_lab_manager':
@@ -151,19 +103,13 @@ class MainApplication(QMainWindow):
             layout.addWidget(QLabel("📅 Current Calendar"))
             layout.addWidget(calendar)
 
-            maintenance_data = db_query("SELECT scheduled_for FROM maintenance_log")
-            for row in maintenance_data:
-                date_str = row[0]
-                qdate = QDate.fromString(date_str, "yyyy-MM-dd")
-                if qdate.isValid():
-                    fmt = QTextCharFormat()
-                    fmt.setForeground(Qt.red)
-                    calendar.setDateTextFormat(qdate, fmt)
+            self.attach_month_tasks(calendar)
 
             actions = [
                 ("📋 Assign Equipment Number", self.assign_equipment_number),
                 ("📄 View Equipment List", self.view_equipment_list),
                 ("🛠️ Assign Maintenance Schedule", self.assign_maintenance_schedule_with_tasks),
+                ("🗓️ Bulk Schedule / Import", self.bulk_schedule_maintenance),
                 ("📅 View Maintenance Schedule", self.view_maintenance_schedule),
                 ("📓 View Maintenance Log", self.view_maintenance_log),
                 ("📤 Upload Reports / Standards / DVPRs", self.upload_storage_file),
@@ -174,29 +120,11 @@ class MainApplication(QMainWindow):
                 ("🧪 Review Pending Test Reports", self.review_pending_test_reports),
                 ("📊 Export Maintenance Log", self.export_maintenance_log_to_csv),
                 ("🔔 View Notifications", self.view_notifications),
-                ("📁 View Approved Reports", self.view_approved_test_reports)
+                ("📁 View Approved Reports", self.view_approved_test_reports),
+                ("🔍 Search Documents", self.search_documents)
             ]
 
-            for index, (text, handler) in enumerate(actions):
-                btn = QPushButton(text)
-                btn.setStyleSheet("""
-                    QPushButton {
-                        padding: 10px;
-                        font-size: 10pt;
-                        background-color: #f5f5f5;
-                        border: 1px solid #ccc;
-                        border-radius: 6px;
-                        text-align: left;
-                    }
-                    QPushButton:hover {
-                        background-color: #e6f2ff;
-                        border: 1px solid #007acc;
-                    }
-                """)
-                btn.clicked.connect(handler)
-                row = index // 2
-                col = index % 2
-                grid_layout.addWidget(btn, row, col)
+            self.add_dashboard_buttons(grid_layout, actions)
 
             layout.addWidget(grid)
 
@@ -213,28 +141,10 @@ class MainApplication(QMainWindow):
                 ("📚 View Uploaded Procedures", self.view_uploaded_procedures_with_folders),
                 ("📤 Submit New Test Report", self.submit_test_report),
                 ("🔔 View Notifications", self.view_notifications),
+                ("🔍 Search Documents", self.search_documents),
             ]
 
-            for index, (text, handler) in enumerate(actions):
-                btn = QPushButton(text)
-                btn.setStyleSheet("""
-                    QPushButton {
-                        padding: 10px;
-                        font-size: 10pt;
-                        background-color: #f5f5f5;
-                        border: 1px solid #ccc;
-                        border-radius: 6px;
-                        text-align: left;
-                    }
-                    QPushButton:hover {
-                        background-color: #e6f2ff;
-                        border: 1px solid #007acc;
-                    }
-                """)
-                btn.clicked.connect(handler)
-                row = index // 2
-                col = index % 2
-                grid_layout.addWidget(btn, row, col)
+            self.add_dashboard_buttons(grid_layout, actions)
 
             layout.addWidget(grid)
 
@@ -243,6 +153,104 @@ class MainApplication(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
+        # Counters come from the trigger-maintained dashboard_stats row; writes
+        # made on any thread of this process (imports, uploads) refresh them
+        self.counters_changed.connect(self.refresh_counters, Qt.QueuedConnection)
+        add_commit_listener(self.on_commit)
+        self.refresh_counters()
+
+        # Unread notifications: everything after the user's read cursor. Later
+        # arrivals are fetched incrementally (id > last id read) when a commit
+        # from another connection moves data_version, or a local commit writes
+        # notifications
+        self.read_cursor = read_cursor(user[0])
+        self.feed_last_id = newest_id()
+        self.unread = unread_count(user[0], self.read_cursor, self.feed_last_id)
+        self.latest_notification = None
+        self.feed_version = data_version()
+        self.notifications_changed.connect(lambda: self.poll_notifications(force=True), Qt.QueuedConnection)
+        self.notification_timer = QTimer(self)
+        self.notification_timer.timeout.connect(self.poll_notifications)
+        self.notification_timer.start(NOTIFICATION_POLL_MS)
+        self.update_unread_badge()
+
+    def start_reminder_alerts(self):
+        """Start the reminder thread; called once the window is shown, stopped again on close."""
+        # Reminders are timed on their own thread and shown on this one
+        self.reminder_notifier = ReminderNotifier(self)
+        self.reminder_notifier.due.connect(show_maintenance_alert, Qt.QueuedConnection)
+        start_reminders(self.reminder_notifier.due.emit)
+
+    def add_dashboard_buttons(self, grid_layout, actions):
+        """Lay (text, handler) actions out two per row, registering the counter and notification buttons."""
+        for index, (text, handler) in enumerate(actions):
+            btn = QPushButton(text)
+            btn.setStyleSheet("""
+                QPushButton {
+                    padding: 10px;
+                    font-size: 10pt;
+                    background-color: #f5f5f5;
+                    border: 1px solid #ccc;
+                    border-radius: 6px;
+                    text-align: left;
+                }
+                QPushButton:hover {
+                    background-color: #e6f2ff;
+                    border: 1px solid #007acc;
+                }
+            """)
+            btn.clicked.connect(handler)
+            counter = BUTTON_COUNTERS.get(handler.__name__)
+            if counter:
+                self.counter_buttons.append((btn, text, counter))
+                btn.clicked.connect(self.refresh_counters)  # after the dialog closes
+            elif handler.__name__ == "view_notifications":
+                self.notifications_button = (btn, text)
+            grid_layout.addWidget(btn, index // 2, index % 2)
+
+    def on_commit(self, tables):
+        if tables & STATS_SOURCE_TABLES:
+            self.counters_changed.emit()
+        if "notifications" in tables:
+            self.notifications_changed.emit()
+
+    def poll_notifications(self, force=False):
+        """Add notifications that arrived since the last poll to the unread badge."""
+        version = data_version()
+        if version == self.feed_version and not force:
+            return
+        self.feed_version = version
+        # Another connection committed: the counters may have moved too
+        self.refresh_counters()
+        arrived = []
+        while True:
+            rows = new_notifications(self.user[0], self.feed_last_id)
+            if rows:
+                self.feed_last_id = rows[-1].id
+                arrived += rows
+            if len(rows) < FEED_BATCH:
+                break
+        if arrived:
+            self.unread += len(arrived)
+            self.latest_notification = arrived[-1]
+            self.update_unread_badge()
+
+    def update_unread_badge(self):
+        if self.notifications_button is None:
+            return
+        button, label = self.notifications_button
+        button.setText(f"{label}  ({badge_text(self.unread)} new)" if self.unread else label)
+        latest = self.latest_notification
+        button.setToolTip(f"Latest: {latest.message} ({latest.created_at})" if self.unread and latest else "")
+
+    def refresh_counters(self):
+        if not self.counter_buttons:
+            return
+        counts = dashboard_counts()
+        for button, label, counter in self.counter_buttons:
+            count = getattr(counts, counter)
+            button.setText(f"{label}  ({count})" if count else label)
+
     def assign_equipment_number(self):
         dialog = QDialog(self)
         dialog.setWindowTitle("Assign Equipment Number")
@@ -274,14 +282,16 @@ class MainApplication(QMainWindow):
         dialog.setWindowTitle("Equipment List")
         layout = QVBoxLayout()
 
-        equipment_list = QListWidget()
-        records = db_query('SELECT equipment_num, name, next_maintenance FROM equipment ORDER BY equipment_num')
-        for number, name, date in records:
-            item = f"[{number}] {name} - Next Maintenance: {date if date else 'N/A'}"
-            equipment_list.addItem(item)
+        model = KeysetTableModel(
+            ["equipment_num", "name", "next_maintenance"], "equipment",
+            order_by=["COALESCE(equipment_num, '')", "id"],
+            headers=["Number", "Name", "Next Maintenance"],
+            formatters={2: lambda date: date if date else 'N/A'},
+            owner=dialog, tables=("equipment",), parent=dialog)
 
-        layout.addWidget(equipment_list)
+        layout.addWidget(self.paged_table(model))
         dialog.setLayout(layout)
+        dialog.setMinimumSize(500, 400)
         dialog.exec()
 
     def view_maintenance_schedule(self):
@@ -293,23 +303,27 @@ class MainApplication(QMainWindow):
 
         # ❗ Only fetch unacknowledged tasks
         records = db_query("""
-            SELECT ml.id, eq.equipment_num, eq.name, ml.scheduled_for, ml.task, ml.acknowledged_by, ml.acknowledged_at
+            SELECT ml.id, eq.equipment_num, eq.name, ml.scheduled_for, ml.task, ml.acknowledged_by, ml.acknowledged_at, ml.rule_id
             FROM maintenance_log ml
             LEFT JOIN equipment eq ON ml.equipment_id = eq.id
             WHERE ml.acknowledged_by IS NULL
             ORDER BY ml.scheduled_for
         """)
+        # Recurring tasks: every unacknowledged occurrence up to the horizon, expanded on demand
+        records += [(None, o.equipment_num, o.equipment_name, o.due.isoformat(), o.task, None, None, o.rule_id)
+                    for o in pending_occurrences()]
+        records.sort(key=lambda record: record[3] or "")
 
         for record in records:
-            log_id, eq_num, eq_name, scheduled_for, task, ack_by, ack_at = record
-            status = "Pending"
+            log_id, eq_num, eq_name, scheduled_for, task, ack_by, ack_at, rule_id = record
+            status = "Pending, repeating" if rule_id else "Pending"
             display_text = f"[{eq_num}] {eq_name} — Due: {scheduled_for} | {status}"
             item = QListWidgetItem(display_text)
             item.setData(Qt.UserRole, record)
             list_widget.addItem(item)
 
         def show_task_details(item):
-            log_id, eq_num, eq_name, scheduled_for, task, ack_by, ack_at = item.data(Qt.UserRole)
+            log_id, eq_num, eq_name, scheduled_for, task, ack_by, ack_at, rule_id = item.data(Qt.UserRole)
 
             task_dialog = QDialog(self)
             task_dialog.setWindowTitle(f"{eq_name} — {scheduled_for}")
@@ -323,12 +337,15 @@ class MainApplication(QMainWindow):
 
             def update_ack():
                 if acknowledge_box.isChecked():
-                    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    db_query("""
-                        UPDATE maintenance_log 
-                        SET acknowledged_by = ?, acknowledged_at = ? 
-                        WHERE id = ?
-                    """, (self.user[1], now, log_id))
+                    if log_id is None:
+                        acknowledge_occurrence(rule_id, scheduled_for, self.user[1])
+                    else:
+                        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        db_query("""
+                            UPDATE maintenance_log 
+                            SET acknowledged_by = ?, acknowledged_at = ? 
+                            WHERE id = ?
+                        """, (self.user[1], now, log_id))
                     QMessageBox.information(task_dialog, "Updated", "Maintenance task acknowledged.")
                     task_dialog.accept()
                     dialog.accept()  # Close the main schedule view to refresh list
@@ -337,6 +354,17 @@ class MainApplication(QMainWindow):
             save_button.clicked.connect(update_ack)
             task_layout.addWidget(save_button)
 
+            if rule_id:
+                def stop_repeating():
+                    end_rule(rule_id, scheduled_for)
+                    QMessageBox.information(task_dialog, "Updated", f"This task no longer repeats after {scheduled_for}.")
+                    task_dialog.accept()
+                    dialog.accept()
+
+                stop_button = QPushButton("Stop Repeating After This")
+                stop_button.clicked.connect(stop_repeating)
+                task_layout.addWidget(stop_button)
+
             task_dialog.setLayout(task_layout)
             task_dialog.exec()
 
@@ -385,7 +413,7 @@ class MainApplication(QMainWindow):
         folder_dropdown = QComboBox()
         report_root = 'uploaded_reports'
         os.makedirs(report_root, exist_ok=True)
-        folders = [f for f in os.listdir(report_root) if os.path.isdir(os.path.join(report_root, f))]
+        folders = list_subfolders(report_root)
         folder_dropdown.addItem("Base Directory")  # Default
         folder_dropdown.addItems(folders)
         folder_dropdown.addItem("+ Create New Folder")
@@ -405,6 +433,7 @@ class MainApplication(QMainWindow):
                         new_path = os.path.join(report_root, folder_name)
                         if not os.path.exists(new_path):
                             os.makedirs(new_path)
+                            index_file(new_path)
                             folder_dropdown.insertItem(folder_dropdown.count() - 1, folder_name)
                             folder_dropdown.setCurrentText(folder_name)
                             QMessageBox.information(self, "Success", f"Folder '{folder_name}' created.")
@@ -445,61 +474,152 @@ class MainApplication(QMainWindow):
                     target_dir = report_root
                 else:
                     target_dir = os.path.join(report_root, selected_folder)
-                os.makedirs(target_dir, exist_ok=True)
 
-                success_count = 0
-                fail_count = 0
+                def finished(result):
+                    # Log the whole drop in DB at once
+                    recorder = UploadLogRecorder(selected_folder, self.user[1])
+                    recorder.add_all(result.succeeded)
+                    try:
+                        recorder.flush()
+                    except sqlite3.Error as e:
+                        QMessageBox.warning(inner_self, "Upload Log", f"Files were uploaded but could not be logged: {e}")
 
-                for url in urls:
-                    file_path = url.toLocalFile()
-                    if file_path.lower().endswith('.pdf'):
-                        target_file = os.path.join(target_dir, os.path.basename(file_path))
-                        try:
-                            shutil.copy(file_path, target_file)
-                            inner_self.addItem(os.path.basename(file_path))
-                            success_count += 1
-
-                            # Log in DB
-                            conn = sqlite3.connect('storage.db')
-                            cursor = conn.cursor()
-                            cursor.execute("INSERT INTO upload_log (filename, folder, uploaded_by, uploaded_at) VALUES (?, ?, ?, ?)", (
-                                os.path.basename(file_path),
-                                selected_folder,
-                                self.user[1],
-                                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            ))
-                            conn.commit()
-                            conn.close()
-                        except Exception:
-                            fail_count += 1
-                    else:
-                        fail_count += 1  # unsupported file type
+                    # Combined message at the end
+                    QMessageBox.information(inner_self, "Upload Summary", result.summary())
 
-                # Combined message at the end
-                QMessageBox.information(inner_self, "Upload Summary",
-                    f"✅ Successfully uploaded: {success_count} file(s)\n❌ Failed to upload: {fail_count} file(s)")
+                self.start_upload(inner_self, progress_bar, cancel_button, dialog,
+                                  [url.toLocalFile() for url in urls], target_dir, ['.pdf'], finished)
 
         upload_area = DropListWidget()
         layout.addWidget(upload_area)
+        progress_bar, cancel_button = self.upload_progress_widgets(layout)
 
         dialog.setLayout(layout)
         dialog.setMinimumSize(400, 350)
+        dialog.exec()
 
-        # Create upload_log table if it doesn't exist
-        conn = sqlite3.connect('storage.db')
-        cursor = conn.cursor()
-        cursor.execute('''CREATE TABLE IF NOT EXISTS upload_log (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            filename TEXT,
-                            folder TEXT,
-                            uploaded_by TEXT,
-                            uploaded_at TEXT
-                        )''')
-        conn.commit()
-        conn.close()
 
-        dialog.exec()
+    def upload_progress_widgets(self, layout):
+        """Aggregate progress bar + cancel button for a drop-to-upload dialog (hidden until a drop)."""
+        progress_bar = QProgressBar()
+        progress_bar.setRange(0, 100)
+        progress_bar.hide()
+        cancel_button = QPushButton("Cancel Upload")
+        cancel_button.hide()
+        layout.addWidget(progress_bar)
+        layout.addWidget(cancel_button)
+        return progress_bar, cancel_button
+
+    def attach_month_tasks(self, calendar):
+        """Mark days with maintenance tasks on calendar's visible month, loading month by month.
+
+        The neighbouring months are prefetched in the background whenever the
+        page changes. Returns tasks_on(qdate) -> [(log_id, name, task, acknowledged, rule_id)].
+        """
+        def show_month(year, month):
+            calendar.setDateTextFormat(QDate(), QTextCharFormat())  # clear the previous page
+            fmt = QTextCharFormat()
+            fmt.setForeground(Qt.red)
+            for day in month_tasks(year, month):
+                qdate = QDate.fromString(day, "yyyy-MM-dd")
+                if qdate.isValid():
+                    calendar.setDateTextFormat(qdate, fmt)
+            # Warm the read cache for the next page turn. No owner: the prefetch
+            # touches no widgets, and the dashboard calendar lives as long as the
+            # window, so an owner would only pile up destroyed connections
+            for adjacent in adjacent_months(year, month):
+                run_query(MONTH_TASKS_SQL, month_window(*adjacent), tables=MONTH_TABLES, owner=None)
+
+        def tasks_on(qdate):
+            # Re-read (normally from cache) so acknowledgements made meanwhile show up
+            tasks = month_tasks(calendar.yearShown(), calendar.monthShown())
+            return tasks.get(qdate.toString("yyyy-MM-dd"), [])
+
+        calendar.currentPageChanged.connect(show_month)
+        show_month(calendar.yearShown(), calendar.monthShown())
+        return tasks_on
+
+    def paged_table(self, model):
+        """Read-only, row-selecting table over a KeysetTableModel; loads its first page."""
+        view = QTableView()
+        view.setModel(model)
+        view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        view.setSelectionMode(QAbstractItemView.SingleSelection)
+        view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        view.setWordWrap(False)
+        view.verticalHeader().hide()
+        view.horizontalHeader().setStretchLastSection(True)
+        model.fetchMore()
+        return view
+
+    def watch_folder_index(self, root, reload, owner, folder=None):
+        """Rescan root's index off the UI thread and call reload() if anything changed.
+
+        folder is the directory the dialog shows; its files are also stat'ed
+        so edits made in place elsewhere show up while it is open.
+        """
+        run_in_background(refresh_file_index, root, folder,
+                          on_result=lambda changed: reload() if changed else None, owner=owner)
+
+    def start_upload(self, drop_widget, progress_bar, cancel_button, dialog, file_paths, target_dir, allowed_extensions, on_finished):
+        """Copy dropped files on a worker pool, streaming progress into drop_widget."""
+        if getattr(drop_widget, "upload_task", None) is not None:
+            QMessageBox.warning(drop_widget, "Upload In Progress", "Please wait for the current upload to finish.")
+            return
 
+        items = {}
+
+        def item_for(name):
+            if name not in items:
+                items[name] = QListWidgetItem(name)
+                drop_widget.addItem(items[name])
+            return items[name]
+
+        def on_progress(event):
+            name = event["file"]
+            if "error" in event:
+                item_for(name).setText(f"{name} — failed")
+            elif event["done"] < event["size"]:
+                item_for(name).setText(f"{name} — {event['done'] * 100 // event['size']}%")
+            else:
+                item_for(name).setText(name)
+            if event["total_size"]:
+                progress_bar.setValue(event["total_done"] * 100 // event["total_size"])
+
+        def done():
+            drop_widget.upload_task = None
+            progress_bar.hide()
+            cancel_button.hide()
+
+        def finished(result):
+            done()
+            index_documents(stored.dst for stored in result.succeeded)
+            for name in result.cancelled:
+                if name in items:
+                    drop_widget.takeItem(drop_widget.row(items.pop(name)))
+            on_finished(result)
+
+        def failed(message):
+            done()
+            QMessageBox.critical(drop_widget, "Upload Failed", f"Upload failed: {message}")
+
+        progress_bar.setValue(0)
+        progress_bar.show()
+        cancel_button.setEnabled(True)
+        cancel_button.show()
+        task = run_in_background(
+            run_upload, file_paths, target_dir, allowed_extensions,
+            pass_task=True, on_result=finished, on_error=failed, on_progress=on_progress,
+        )
+        # Closing the dialog stops the copy early but, unlike an owner, keeps the
+        # result, so the files that did arrive are still logged and indexed
+        dialog.finished.connect(task.stop)
+        drop_widget.upload_task = task
+        try:
+            cancel_button.clicked.disconnect()
+        except (RuntimeError, TypeError):
+            pass
+        cancel_button.clicked.connect(lambda: (cancel_button.setEnabled(False), task.stop()))
 
     def view_uploaded_reports(self):
         dialog = QDialog(self)
@@ -510,9 +630,12 @@ class MainApplication(QMainWindow):
         report_root = 'uploaded_reports'
         os.makedirs(report_root, exist_ok=True)
 
-        folders = [f for f in os.listdir(report_root) if os.path.isdir(os.path.join(report_root, f))]
-        for folder in folders:
-            folder_list.addItem(folder)
+        def load_folders():
+            folder_list.clear()
+            folder_list.addItems(list_subfolders(report_root))
+
+        load_folders()
+        self.watch_folder_index(report_root, load_folders, dialog)
 
         def open_folder(item):
             folder_path = os.path.join(report_root, item.text())
@@ -521,16 +644,20 @@ class MainApplication(QMainWindow):
             file_layout = QVBoxLayout()
 
             file_list = QListWidget()
-            for file_name in os.listdir(folder_path):
-                if file_name.lower().endswith('.pdf'):
-                    file_list.addItem(file_name)
+
+            def load_files():
+                file_list.clear()
+                file_list.addItems(list_dir(folder_path, ('.pdf',)))
+
+            load_files()
+            self.watch_folder_index(report_root, load_files, file_dialog, folder_path)
 
             def delete_file():
                 selected_item = file_list.currentItem()
                 if selected_item:
                     file_path = os.path.join(folder_path, selected_item.text())
                     if os.path.exists(file_path):
-                        os.remove(file_path)
+                        delete_stored_file(file_path)
                         file_list.takeItem(file_list.currentRow())
                         QMessageBox.information(self, "File Deleted", f"Deleted: {selected_item.text()}")
 
@@ -570,7 +697,7 @@ class MainApplication(QMainWindow):
         layout.addWidget(equipment_label)
 
         equipment_dropdown = QComboBox()
-        equipment_data = db_query("SELECT id, name FROM equipment")
+        equipment_data = cached_query("SELECT id, name FROM equipment", tables=("equipment",))
         equipment_map = {}
         for eid, name in equipment_data:
             equipment_map[name] = eid
@@ -589,24 +716,68 @@ class MainApplication(QMainWindow):
         task_input.setPlaceholderText("e.g. Check calibration, replace filter")
         layout.addWidget(task_input)
 
+        # Repeating schedules are stored as a rule; occurrences are expanded when viewed
+        layout.addWidget(QLabel("Repeat:"))
+        repeat_dropdown = QComboBox()
+        repeat_dropdown.addItems(["Does not repeat", "Every N days", "Weekly", "Monthly", "Yearly", "Custom rule"])
+        layout.addWidget(repeat_dropdown)
+        repeat_every = QSpinBox()
+        repeat_every.setRange(1, 3650)
+        repeat_every.setPrefix("Every ")
+        layout.addWidget(repeat_every)
+        custom_rule = QLineEdit()
+        custom_rule.setPlaceholderText("e.g. FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH;COUNT=10")
+        layout.addWidget(custom_rule)
+
+        def update_repeat_inputs():
+            choice = repeat_dropdown.currentText()
+            repeat_every.setVisible(choice in ("Every N days", "Weekly", "Monthly", "Yearly"))
+            repeat_every.setSuffix({"Weekly": " week(s)", "Monthly": " month(s)", "Yearly": " year(s)"}.get(choice, " day(s)"))
+            custom_rule.setVisible(choice == "Custom rule")
+
+        repeat_dropdown.currentIndexChanged.connect(update_repeat_inputs)
+        update_repeat_inputs()
+
+        def repeat_rule():
+            choice = repeat_dropdown.currentText()
+            if choice == "Does not repeat":
+                return None
+            if choice == "Custom rule":
+                return custom_rule.text()
+            freq = {"Every N days": "DAILY", "Weekly": "WEEKLY", "Monthly": "MONTHLY", "Yearly": "YEARLY"}[choice]
+            return f"FREQ={freq};INTERVAL={repeat_every.value()}"
+
         assign_button = QPushButton("Assign")
         def assign():
             selected_name = equipment_dropdown.currentText()
             equipment_id = equipment_map.get(selected_name)
             date = date_picker.date().toString(Qt.ISODate)
             task_description = task_input.text().strip()
-            db_query("UPDATE equipment SET next_maintenance = ?, description = ? WHERE id = ?", (date, task_description, equipment_id))
-            db_query("""
-    INSERT INTO maintenance_log (equipment_id, task, scheduled_by, scheduled_at, scheduled_for)
-    VALUES (?, ?, ?, ?, ?)
-""", (
-    equipment_id,
-    task_description,
-    scheduled_by,
-    datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-    date_picker.date().toString(Qt.ISODate)
-))
-            QMessageBox.information(self, "Success", f"Scheduled maintenance for '{selected_name}' on {date} with task: {task_description}")
+            rule = repeat_rule()
+            try:
+                with transaction():
+                    db_query("UPDATE equipment SET next_maintenance = ?, description = ? WHERE id = ?", (date, task_description, equipment_id))
+                    if rule is not None:
+                        add_rule(equipment_id, task_description, rule, date, scheduled_by)
+                    else:
+                        db_query("""
+                            INSERT INTO maintenance_log (equipment_id, task, scheduled_by, scheduled_at, scheduled_for)
+                            VALUES (?, ?, ?, ?, ?)
+                        """, (
+                            equipment_id,
+                            task_description,
+                            scheduled_by,
+                            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                            date
+                        ))
+            except ValueError as e:
+                QMessageBox.warning(dialog, "Invalid Repeat Rule", str(e))
+                return
+            except sqlite3.Error as e:
+                QMessageBox.critical(dialog, "Error", f"Failed to schedule maintenance: {e}")
+                return
+            repeats = f" ({describe_rule(rule)})" if rule is not None else ""
+            QMessageBox.information(self, "Success", f"Scheduled maintenance for '{selected_name}' on {date}{repeats} with task: {task_description}")
             dialog.accept()
 
         assign_button.clicked.connect(assign)
@@ -614,6 +785,84 @@ class MainApplication(QMainWindow):
         dialog.setLayout(layout)
         dialog.exec()
 
+    def bulk_schedule_maintenance(self):
+        """Schedule many items at once, from a multi-selection or a CSV/XLSX file, in one transaction."""
+        from PySide6.QtWidgets import QFileDialog
+
+        scheduled_by = self.user[1]
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Bulk Maintenance Scheduling")
+        layout = QVBoxLayout()
+
+        layout.addWidget(QLabel("Select Equipment (Ctrl/Shift-click for several):"))
+        equipment_list = QListWidget()
+        equipment_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        for eid, num, name in cached_query("SELECT id, equipment_num, name FROM equipment ORDER BY equipment_num",
+                                           tables=("equipment",)):
+            item = QListWidgetItem(f"[{num or '-'}] {name}")
+            item.setData(Qt.UserRole, eid)
+            equipment_list.addItem(item)
+        layout.addWidget(equipment_list)
+
+        layout.addWidget(QLabel("Maintenance Date:"))
+        date_picker = QDateEdit()
+        date_picker.setCalendarPopup(True)
+        date_picker.setDate(QDate.currentDate())
+        layout.addWidget(date_picker)
+
+        layout.addWidget(QLabel("Maintenance Tasks/Instructions:"))
+        task_input = QLineEdit()
+        task_input.setPlaceholderText("e.g. Annual calibration")
+        layout.addWidget(task_input)
+
+        def schedule_selected():
+            items = equipment_list.selectedItems()
+            if not items:
+                QMessageBox.warning(dialog, "No Equipment", "Select at least one equipment item.")
+                return
+            day = date_picker.date().toString(Qt.ISODate)
+            task = task_input.text().strip()
+            start = time.perf_counter()
+            try:
+                count = schedule_entries([(item.data(Qt.UserRole), day, task) for item in items], scheduled_by)
+            except sqlite3.Error as e:
+                QMessageBox.critical(dialog, "Error", f"Failed to schedule maintenance: {e}")
+                return
+            QMessageBox.information(dialog, "Scheduled", schedule_summary(count, [], time.perf_counter() - start))
+            dialog.accept()
+
+        def import_file():
+            path, _ = QFileDialog.getOpenFileName(dialog, "Import Maintenance Schedule", "",
+                                                  "Schedules (*.csv *.xlsx)")
+            if not path:
+                return
+            import_button.setEnabled(False)
+            schedule_button.setEnabled(False)
+
+            def finished(result):
+                QMessageBox.information(self, "Import Complete", schedule_summary(*result))
+                dialog.accept()
+
+            def failed(message):
+                import_button.setEnabled(True)
+                schedule_button.setEnabled(True)
+                QMessageBox.critical(dialog, "Import Failed", f"Nothing was scheduled: {message}")
+
+            # Parsing and the single write transaction run off the UI thread
+            run_in_background(import_schedule, path, scheduled_by, on_result=finished, on_error=failed, owner=dialog)
+
+        schedule_button = QPushButton("Schedule Selected")
+        schedule_button.clicked.connect(schedule_selected)
+        layout.addWidget(schedule_button)
+
+        import_button = QPushButton("Import CSV / Excel... (equipment_num, scheduled_for, task)")
+        import_button.clicked.connect(import_file)
+        layout.addWidget(import_button)
+
+        dialog.setLayout(layout)
+        dialog.setMinimumSize(450, 500)
+        dialog.exec()
+
     def acknowledge_maintenance_task_calendar(self):
         dialog = QDialog(self)
         dialog.setWindowTitle("Acknowledge Maintenance via Calendar")
@@ -624,29 +873,12 @@ class MainApplication(QMainWindow):
         calendar.setGridVisible(True)
         layout.addWidget(calendar)
 
-        # Updated to pull from maintenance_log instead of equipment
-        maintenance_data = db_query("""
-            SELECT ml.id, eq.name, ml.scheduled_for, ml.task, ml.acknowledged_by
-            FROM maintenance_log ml
-            LEFT JOIN equipment eq ON ml.equipment_id = eq.id
-        """)
-
-        date_to_tasks = {}
-        for log_id, name, scheduled_for, task, ack_by in maintenance_data:
-            qdate = QDate.fromString(scheduled_for, "yyyy-MM-dd")
-            if qdate.isValid():
-                if qdate not in date_to_tasks:
-                    date_to_tasks[qdate] = []
-                date_to_tasks[qdate].append((log_id, name, task, bool(ack_by)))
-
-        for qdate in date_to_tasks:
-            fmt = QTextCharFormat()
-            fmt.setForeground(Qt.red)
-            calendar.setDateTextFormat(qdate, fmt)
+        # Only the visible month is loaded, from maintenance_log and the recurring rules
+        tasks_on = self.attach_month_tasks(calendar)
 
         def show_tasks_for_date(selected_date):
             task_list = QListWidget()
-            tasks = date_to_tasks.get(selected_date, [])
+            tasks = tasks_on(selected_date)
             if not tasks:
                 QMessageBox.information(dialog, "No Tasks", "No maintenance tasks scheduled for this date.")
                 return
@@ -655,13 +887,15 @@ class MainApplication(QMainWindow):
             task_dialog.setWindowTitle(f"Tasks on {selected_date.toString('yyyy-MM-dd')}")
             task_layout = QVBoxLayout()
 
-            for log_id, name, task, acknowledged in tasks:
+            for log_id, name, task, acknowledged, rule_id in tasks:
                 item_text = f"{name}: {task}"
                 checkbox = QCheckBox(item_text)
                 checkbox.setChecked(acknowledged)
 
-                def update_acknowledgement(state, log_id=log_id):
-                    if state == Qt.Checked:
+                def update_acknowledgement(state, log_id=log_id, rule_id=rule_id):
+                    if state == Qt.Checked and log_id is None:
+                        acknowledge_occurrence(rule_id, selected_date.toString("yyyy-MM-dd"), self.user[1])
+                    elif state == Qt.Checked:
                         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                         db_query("""
                             UPDATE maintenance_log 
@@ -696,6 +930,7 @@ class MainApplication(QMainWindow):
                 new_path = os.path.join('uploaded_reports', folder_name)
                 if not os.path.exists(new_path):
                     os.makedirs(new_path)
+                    index_file(new_path)
                     QMessageBox.information(self, "Folder Created", f"Folder '{folder_name}' created successfully.")
                     dialog.accept()
                 else:
@@ -713,27 +948,19 @@ class MainApplication(QMainWindow):
         dialog.setWindowTitle("Maintenance Log")
         layout = QVBoxLayout()
 
-        log_list = QListWidget()
-        records = db_query("""
-            SELECT ml.id, eq.equipment_num, eq.name, ml.task, ml.scheduled_by,
-                   ml.scheduled_at, ml.acknowledged_by, ml.acknowledged_at
-            FROM maintenance_log ml
-            LEFT JOIN equipment eq ON ml.equipment_id = eq.id
-            ORDER BY ml.scheduled_at DESC
-        """)
-
-        for log_id, eq_num, eq_name, task, sched_by, sched_at, ack_by, ack_at in records:
-            lines = [
-                f"[{eq_num}] {eq_name}",
-                f"Task: {task}",
-                f"Scheduled by: {sched_by} at {sched_at}",
-                f"Acknowledged by: {ack_by} at {ack_at}" if ack_by else "Acknowledged: [Pending]"
-            ]
-            log_list.addItem("\n".join(lines))
-
-        layout.addWidget(log_list)
+        model = KeysetTableModel(
+            ["eq.equipment_num", "eq.name", "ml.task", "ml.scheduled_by", "ml.scheduled_at",
+             "ml.acknowledged_by", "ml.acknowledged_at"],
+            "maintenance_log ml LEFT JOIN equipment eq ON ml.equipment_id = eq.id",
+            order_by=["COALESCE(ml.scheduled_at, '')", "ml.id"], descending=True,
+            headers=["Number", "Equipment", "Task", "Scheduled By", "Scheduled At",
+                     "Acknowledged By", "Acknowledged At"],
+            formatters={5: lambda ack_by: ack_by if ack_by else "[Pending]"},
+            owner=dialog, tables=("maintenance_log", "equipment"), parent=dialog)
+
+        layout.addWidget(self.paged_table(model))
         dialog.setLayout(layout)
-        dialog.setMinimumSize(500, 400)
+        dialog.setMinimumSize(800, 400)
         dialog.exec()
 
     def upload_procedure_file(self):
@@ -762,22 +989,19 @@ class MainApplication(QMainWindow):
 
             def dropEvent(inner_self, event):
                 urls = event.mimeData().urls()
-                for url in urls:
-                    file_path = url.toLocalFile()
-                    ext = os.path.splitext(file_path)[1].lower()
-                    if ext in allowed_extensions:
-                        try:
-                            target_file = os.path.join(target_dir, os.path.basename(file_path))
-                            shutil.copy(file_path, target_file)
-                            inner_self.addItem(os.path.basename(file_path))
-                            QMessageBox.information(inner_self, "Uploaded", f"Successfully uploaded: {os.path.basename(file_path)}")
-                        except Exception as e:
-                            QMessageBox.critical(inner_self, "Error", f"Upload failed: {e}")
-                    else:
-                        QMessageBox.warning(inner_self, "Invalid Format", f"Unsupported file type: {ext}")
+
+                def finished(result):
+                    message = result.summary()
+                    if result.failed:
+                        message += "\n\n" + "\n".join(f"{name}: {reason}" for name, reason in result.failed)
+                    QMessageBox.information(inner_self, "Upload Summary", message)
+
+                self.start_upload(inner_self, progress_bar, cancel_button, dialog,
+                                  [url.toLocalFile() for url in urls], target_dir, allowed_extensions, finished)
 
         upload_area = DropListWidget()
         layout.addWidget(upload_area)
+        progress_bar, cancel_button = self.upload_progress_widgets(layout)
 
         dialog.setLayout(layout)
         dialog.setMinimumSize(600, 500)
@@ -802,7 +1026,7 @@ class MainApplication(QMainWindow):
         os.makedirs(procedures_root, exist_ok=True)
 
         folder_dropdown = QComboBox()
-        folders = [f for f in os.listdir(procedures_root) if os.path.isdir(os.path.join(procedures_root, f))]
+        folders = list_subfolders(procedures_root)
         folder_dropdown.addItem("Base Directory")
         folder_dropdown.addItems(folders)
         folder_dropdown.addItem("+ Create New Folder")
@@ -823,6 +1047,7 @@ class MainApplication(QMainWindow):
                         path = os.path.join(procedures_root, name)
                         if not os.path.exists(path):
                             os.makedirs(path)
+                            index_file(path)
                             folder_dropdown.insertItem(folder_dropdown.count() - 1, name)
                             folder_dropdown.setCurrentText(name)
                             QMessageBox.information(dialog, "Created", f"Folder '{name}' created.")
@@ -876,30 +1101,14 @@ class MainApplication(QMainWindow):
                 else:
                     target_dir = os.path.join(procedures_root, selected_folder)
 
-                os.makedirs(target_dir, exist_ok=True)
-
-                success_count = 0
-                failure_count = 0
+                def finished(result):
+                    QMessageBox.information(inner_self, "Upload Summary", result.summary())
 
-                for url in urls:
-                    file_path = url.toLocalFile()
-                    ext = os.path.splitext(file_path)[1].lower()
-                    if ext in ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx']:
-                        try:
-                            filename = os.path.basename(file_path)
-                            target_file = os.path.join(target_dir, filename)
-                            shutil.copy(file_path, target_file)
-                            inner_self.addItem(filename)
-                            success_count += 1
-                        except Exception as e:
-                            failure_count += 1
-                    else:
-                        failure_count += 1
-
-                QMessageBox.information(inner_self, "Upload Summary",
-                                        f"✅ Uploaded: {success_count}\n❌ Failed: {failure_count}")
+                self.start_upload(inner_self, progress_bar, cancel_button, dialog,
+                                  [url.toLocalFile() for url in urls], target_dir, allowed_ext, finished)
         upload_area = DropListWidget()
         layout.addWidget(upload_area)
+        progress_bar, cancel_button = self.upload_progress_widgets(layout)
 
         dialog.setLayout(layout)
         dialog.setMinimumSize(600, 400)
@@ -914,11 +1123,14 @@ class MainApplication(QMainWindow):
         os.makedirs(procedures_root, exist_ok=True)
 
         folder_list = QListWidget()
-        folder_list.addItem("Base Directory")
 
-        folders = [f for f in os.listdir(procedures_root) if os.path.isdir(os.path.join(procedures_root, f))]
-        for folder in folders:
-            folder_list.addItem(folder)
+        def load_folders():
+            folder_list.clear()
+            folder_list.addItem("Base Directory")
+            folder_list.addItems(list_subfolders(procedures_root))
+
+        load_folders()
+        self.watch_folder_index(procedures_root, load_folders, dialog)
 
         def open_folder(item):
             folder_path = procedures_root if item.text() == "Base Directory" else os.path.join(procedures_root, item.text())
@@ -927,8 +1139,13 @@ class MainApplication(QMainWindow):
             file_layout = QVBoxLayout()
 
             file_list = QListWidget()
-            for entry in os.listdir(folder_path):
-                file_list.addItem(entry)
+
+            def load_files():
+                file_list.clear()
+                file_list.addItems(list_dir(folder_path))
+
+            load_files()
+            self.watch_folder_index(procedures_root, load_files, file_dialog, folder_path)
 
             def open_file():
                 selected = file_list.currentItem()
@@ -960,6 +1177,7 @@ class MainApplication(QMainWindow):
                     else:
                         try:
                             os.makedirs(new_folder_path)
+                            index_file(new_folder_path)
                             file_list.addItem(name_input.strip())
                             QMessageBox.information(file_dialog, "Created", f"Folder '{name_input.strip()}' created.")
                         except Exception as e:
@@ -996,6 +1214,7 @@ class MainApplication(QMainWindow):
                     new_path = os.path.join(procedures_root, folder_name)
                     if not os.path.exists(new_path):
                         os.makedirs(new_path)
+                        index_file(new_path)
                         folder_list.addItem(folder_name)
                         QMessageBox.information(self, "Folder Created", f"Folder '{folder_name}' created.")
                         create_dialog.accept()
@@ -1021,21 +1240,36 @@ class MainApplication(QMainWindow):
         dialog.setWindowTitle("Review Pending Test Reports")
         layout = QVBoxLayout()
 
-        report_list = QListWidget()
-        records = db_query("SELECT id, filename, uploaded_by, uploaded_at FROM engineer_reports WHERE approved = 0")
-
-        for report_id, filename, uploaded_by, uploaded_at in records:
-            item = QListWidgetItem(f"{filename} | Uploaded by: {uploaded_by} on {uploaded_at}")
-            item.setData(Qt.UserRole, (report_id, filename, uploaded_by))
-            report_list.addItem(item)
+        model = KeysetTableModel(
+            ["id", "filename", "uploaded_by", "uploaded_at"], "engineer_reports",
+            where="approved = 0", order_by=["id"],
+            headers=["ID", "File", "Uploaded By", "Uploaded At"],
+            owner=dialog, parent=dialog)
+        report_table = self.paged_table(model)
+        report_table.setColumnHidden(0, True)
+        report_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+
+        def selected_reports():
+            """[(row, (report_id, filename, uploaded_by))] of the selected reports, bottom row first."""
+            rows = sorted({index.row() for index in report_table.selectionModel().selectedRows()}, reverse=True)
+            selected = []
+            for row in rows:
+                report_id, filename, uploaded_by, _ = model.row_values(row)
+                selected.append((row, (report_id, filename, uploaded_by)))
+            return selected
+
+        def remove_rows(selected):
+            # Bottom row first, so the remaining row numbers stay valid
+            for row, _ in selected:
+                model.remove_row(row)
 
         def open_selected_file():
-            item = report_list.currentItem()
-            if not item:
+            selected = selected_reports()
+            if not selected:
                 QMessageBox.warning(dialog, "No Selection", "Please select a report to open.")
                 return
 
-            _, filename, _ = item.data(Qt.UserRole)
+            _, (_, filename, _) = selected[-1]
             file_path = os.path.join("engineer_reports", filename)
             if os.path.exists(file_path):
                 if platform.system() == 'Windows':
@@ -1048,89 +1282,76 @@ class MainApplication(QMainWindow):
                 QMessageBox.warning(dialog, "File Missing", f"The file {filename} does not exist.")
 
         def approve_selected():
-            item = report_list.currentItem()
-            if not item:
-                QMessageBox.warning(dialog, "No Selection", "Please select a report to approve.")
+            selected = selected_reports()
+            if not selected:
+                QMessageBox.warning(dialog, "No Selection", "Please select the report(s) to approve.")
                 return
 
-            report_id, filename, uploaded_by = item.data(Qt.UserRole)
-            db_query("UPDATE engineer_reports SET approved = 1 WHERE id = ?", (report_id,))
-            report_list.takeItem(report_list.currentRow())
-
-            approved_root = os.path.join("engineer_reports", "approved")
-            os.makedirs(approved_root, exist_ok=True)
-
-            existing_folders = [f for f in os.listdir(approved_root) if os.path.isdir(os.path.join(approved_root, f))]
+            os.makedirs(APPROVED_ROOT, exist_ok=True)
+            existing_folders = list_subfolders(APPROVED_ROOT)
 
+            # One destination folder for the whole selection
             folder_name, ok = QInputDialog.getItem(
                 dialog,
                 "Choose or Create Folder",
-                "Select a folder to move the approved report into:",
+                f"Select a folder to move the {len(selected)} approved report(s) into:",
                 existing_folders + ["[Create New Folder]"],
                 editable=True
             )
+            if not ok or not folder_name:
+                return
+            if folder_name == "[Create New Folder]" or folder_name.strip() == "":
+                folder_name, ok = QInputDialog.getText(dialog, "New Folder", "Enter folder name:")
+                if not ok or not folder_name.strip():
+                    return
 
-            if ok and folder_name:
-                if folder_name == "[Create New Folder]" or folder_name.strip() == "":
-                    folder_name, ok = QInputDialog.getText(dialog, "New Folder", "Enter folder name:")
-
-                if ok and folder_name:
-                    target_dir = os.path.join(approved_root, folder_name.strip())
-                    os.makedirs(target_dir, exist_ok=True)
-                    src_path = os.path.join("engineer_reports", filename)
-                    dest_path = os.path.join(target_dir, filename)
-
-                    try:
-                        shutil.move(src_path, dest_path)
-                        QMessageBox.information(dialog, "Moved", f"Approved report moved to: {dest_path}")
-
-                        # ✅ Notify engineers about approval
-                        db_query("""
-                            INSERT INTO notifications (message, user_role, created_at)
-                            VALUES (?, ?, ?)
-                        """, (
-                            f"✅ The test report '{filename}' was approved by {self.user[1]}.",
-                            "lab_engineer",
-                            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        ))
+            try:
+                moves = approve_reports([report for _, report in selected], folder_name.strip(), self.user[1])
+            except sqlite3.Error as e:
+                QMessageBox.critical(dialog, "Error", f"Failed to approve reports: {e}")
+                return
+            remove_rows(selected)
+
+            def moves_finished(result):
+                moved, failed = result
+                message = f"Approved {len(moves)} report(s); {len(moved)} moved to: {os.path.join(APPROVED_ROOT, folder_name.strip())}"
+                if failed:
+                    message += "\n\nCould not move:\n" + "\n".join(f"- {name}: {reason}" for name, reason in failed)
+                    QMessageBox.warning(self, "Approved", message)
+                else:
+                    QMessageBox.information(self, "Approved", message)
 
-                    except Exception as e:
-                        QMessageBox.critical(dialog, "Error", f"Failed to move approved report: {e}")
+            # The files move on a worker; the dialog stays usable meanwhile
+            run_in_background(move_reports, moves, pass_task=True, on_result=moves_finished,
+                              on_error=lambda message: QMessageBox.critical(self, "Error", f"Failed to move approved reports: {message}"))
 
         def reject_selected():
-            item = report_list.currentItem()
-            if not item:
-                QMessageBox.warning(dialog, "No Selection", "Please select a report to reject.")
+            selected = selected_reports()
+            if not selected:
+                QMessageBox.warning(dialog, "No Selection", "Please select the report(s) to reject.")
                 return
 
-            report_id, filename, uploaded_by = item.data(Qt.UserRole)
-            reason, ok = QInputDialog.getText(dialog, "Reject Report", "Reason for rejection:")
+            reason, ok = QInputDialog.getText(dialog, "Reject Report", f"Reason for rejecting {len(selected)} report(s):")
             if ok and reason.strip():
-                db_query("DELETE FROM engineer_reports WHERE id = ?", (report_id,))
-                report_list.takeItem(report_list.currentRow())
-
-                # Notify engineer about rejection
-                db_query("""
-                    INSERT INTO notifications (message, user_role, created_at)
-                    VALUES (?, ?, ?)
-                """, (
-                    f"❌ The test report '{filename}' was rejected by {self.user[1]}. Reason: {reason.strip()}",
-                    "lab_engineer",
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ))
-
-                QMessageBox.information(dialog, "Rejected", "Report has been rejected and engineer notified.")
-
-        approve_button = QPushButton("✅ Approve Selected Report")
+                try:
+                    reject_reports([report for _, report in selected], reason.strip(), self.user[1])
+                except sqlite3.Error as e:
+                    QMessageBox.critical(dialog, "Error", f"Failed to reject reports: {e}")
+                    return
+                remove_rows(selected)
+
+                QMessageBox.information(dialog, "Rejected", f"{len(selected)} report(s) rejected and engineer(s) notified.")
+
+        approve_button = QPushButton("✅ Approve Selected Report(s)")
         approve_button.clicked.connect(approve_selected)
 
-        reject_button = QPushButton("❌ Reject Selected Report")
+        reject_button = QPushButton("❌ Reject Selected Report(s)")
         reject_button.clicked.connect(reject_selected)
 
         open_button = QPushButton("📂 Open Selected Report")
         open_button.clicked.connect(open_selected_file)
 
-        layout.addWidget(report_list)
+        layout.addWidget(report_table)
         layout.addWidget(open_button)
         layout.addWidget(approve_button)
         layout.addWidget(reject_button)
@@ -1168,17 +1389,24 @@ class MainApplication(QMainWindow):
         dialog.setWindowTitle("Notifications")
         layout = QVBoxLayout()
 
-        notification_list = QListWidget()
-        notifications = db_query("""
-            SELECT message, created_at FROM notifications
-            WHERE user_role = ? OR user_role IS NULL
-            ORDER BY created_at DESC
-        """, (self.user[3],))
-
-        for message, created_at in notifications:
-            notification_list.addItem(f"{created_at}: {message}")
-
-        layout.addWidget(notification_list)
+        # Opening the list marks everything up to the newest notification as read
+        self.poll_notifications(force=True)
+        seen_before = self.read_cursor
+        mark_read(self.user[0], self.feed_last_id)
+        self.read_cursor = max(self.read_cursor, self.feed_last_id)
+        self.unread = 0
+        self.update_unread_badge()
+
+        model = KeysetTableModel(
+            ["n.id", "n.created_at", "n.message"],
+            "notification_recipients r JOIN notifications n ON n.id = r.notification_id",
+            where="r.user_id = ?", params=(self.user[0],),
+            order_by=["r.notification_id"], descending=True,
+            headers=["", "Date", "Message"],
+            formatters={0: lambda nid: "●" if nid > seen_before else ""},
+            owner=dialog, tables=("notifications", "notification_recipients"), parent=dialog)
+
+        layout.addWidget(self.paged_table(model))
         dialog.setLayout(layout)
         dialog.setMinimumSize(500, 300)
         dialog.exec()
@@ -1216,20 +1444,22 @@ class MainApplication(QMainWindow):
             os.makedirs(target_dir, exist_ok=True)
             target_path = os.path.join(target_dir, filename)
             try:
-                shutil.copy(file_path, target_path)
-                db_query("INSERT INTO engineer_reports (filename, uploaded_by, uploaded_at) VALUES (?, ?, ?)", (
-                    filename,
-                    self.user[1],
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ))
-                db_query("""
-                    INSERT INTO notifications (message, user_role, created_at)
-                    VALUES (?, ?, ?)
-                """, (
-                    f"{self.user[1]} submitted a new test report.",
-                    "material_lab_manager",
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ))
+                copy_file(file_path, target_path)
+                now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                with transaction():
+                    db_query("INSERT INTO engineer_reports (filename, uploaded_by, uploaded_at) VALUES (?, ?, ?)", (
+                        filename,
+                        self.user[1],
+                        now
+                    ))
+                    db_query("""
+                        INSERT INTO notifications (message, user_role, created_at)
+                        VALUES (?, ?, ?)
+                    """, (
+                        f"{self.user[1]} submitted a new test report.",
+                        "material_lab_manager",
+                        now
+                    ))
                 QMessageBox.information(dialog, "Success", "Test report submitted successfully.")
                 dialog.accept()
             except Exception as e:
@@ -1252,11 +1482,14 @@ class MainApplication(QMainWindow):
         os.makedirs(approved_root, exist_ok=True)
 
         folder_list = QListWidget()
-        folder_list.addItem("Base Directory")
 
-        folders = [f for f in os.listdir(approved_root) if os.path.isdir(os.path.join(approved_root, f))]
-        for folder in folders:
-            folder_list.addItem(folder)
+        def load_folders():
+            folder_list.clear()
+            folder_list.addItem("Base Directory")
+            folder_list.addItems(list_subfolders(approved_root))
+
+        load_folders()
+        self.watch_folder_index(approved_root, load_folders, dialog)
 
         def open_folder(item):
             folder_path = approved_root if item.text() == "Base Directory" else os.path.join(approved_root, item.text())
@@ -1265,9 +1498,13 @@ class MainApplication(QMainWindow):
             file_layout = QVBoxLayout()
 
             file_list = QListWidget()
-            if os.path.exists(folder_path):
-                for file in os.listdir(folder_path):
-                    file_list.addItem(file)
+
+            def load_files():
+                file_list.clear()
+                file_list.addItems(list_dir(folder_path))
+
+            load_files()
+            self.watch_folder_index(approved_root, load_files, file_dialog, folder_path)
 
             def open_file():
                 selected = file_list.currentItem()
@@ -1310,6 +1547,7 @@ class MainApplication(QMainWindow):
                     new_path = os.path.join(approved_root, folder_name)
                     if not os.path.exists(new_path):
                         os.makedirs(new_path)
+                        index_file(new_path)
                         folder_list.addItem(folder_name)
                         QMessageBox.information(self, "Folder Created", f"Folder '{folder_name}' created.")
                         create_dialog.accept()
@@ -1330,6 +1568,56 @@ class MainApplication(QMainWindow):
         dialog.setMinimumSize(600, 400)
         dialog.exec()
 
+    def search_documents(self):
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Search Documents")
+        layout = QVBoxLayout()
+
+        search_input = QLineEdit()
+        search_input.setPlaceholderText("Search reports, standards and procedures...")
+        layout.addWidget(search_input)
+
+        status_label = QLabel("Type to search. Double-click a result to open it.")
+        layout.addWidget(status_label)
+
+        if not pdf_text_available():
+            pdf_notice = QLabel(f"⚠️ {PDF_TEXT_MISSING}")
+            pdf_notice.setWordWrap(True)
+            layout.addWidget(pdf_notice)
+
+        result_list = QListWidget()
+        result_list.setWordWrap(True)
+        layout.addWidget(result_list)
+
+        def run_search():
+            text = search_input.text().strip()
+            result_list.clear()
+            if not text:
+                status_label.setText("Type to search. Double-click a result to open it.")
+                return
+            started = time.perf_counter()
+            results = search_text(text)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            for path, snippet in results:
+                item = QListWidgetItem(f"{os.path.basename(path)}  ({os.path.dirname(path)})\n{snippet}")
+                item.setData(Qt.UserRole, path)
+                result_list.addItem(item)
+            status_label.setText(f"{len(results)} result(s) in {elapsed_ms:.0f} ms")
+
+        # Search once typing pauses rather than on every keystroke
+        debounce = QTimer(dialog)
+        debounce.setSingleShot(True)
+        debounce.setInterval(200)
+        debounce.timeout.connect(run_search)
+        search_input.textChanged.connect(debounce.start)
+        search_input.returnPressed.connect(run_search)
+
+        result_list.itemDoubleClicked.connect(lambda item: self.open_report_file(item.data(Qt.UserRole)))
+
+        dialog.setLayout(layout)
+        dialog.setMinimumSize(600, 400)
+        dialog.exec()
+
     def open_report_file(self, file_path):
         if os.path.exists(file_path):
             if platform.system() == 'Windows':
@@ -1349,7 +1637,12 @@ class MainApplication(QMainWindow):
         self.login_window.show()
 
     def closeEvent(self, event):
+        stop_reminders()
+        self.notification_timer.stop()
+        remove_commit_listener(self.on_commit)
         db_query("UPDATE users SET logged_in = 0 WHERE id = ?", (self.user[0],))
+        self.audit.log("logout")
+        flush_audit_log()
         event.accept()
     
 
@@ -1372,10 +1665,18 @@ class LoginWindow(QMainWindow):
         self.password_entry.setEchoMode(QLineEdit.Password)
         layout.addWidget(self.password_entry)
 
+        # Indeterminate bar shown while bcrypt runs in the background
+        self.busy_indicator = QProgressBar()
+        self.busy_indicator.setRange(0, 0)
+        self.busy_indicator.setTextVisible(False)
+        self.busy_indicator.hide()
+        layout.addWidget(self.busy_indicator)
+
         button_layout = QHBoxLayout()
-        login_button = QPushButton("Login")
-        login_button.clicked.connect(self.login)
-        button_layout.addWidget(login_button)
+        self.login_button = QPushButton("Login")
+        self.login_button.clicked.connect(self.login)
+        self.password_entry.returnPressed.connect(self.login)
+        button_layout.addWidget(self.login_button)
 
         exit_button = QPushButton("Exit")
         exit_button.clicked.connect(QApplication.quit)
@@ -1394,29 +1695,68 @@ class LoginWindow(QMainWindow):
             fetchone=True
         )
 
-        if user:
-            if user[4] == 1:  # already logged in
-                QMessageBox.warning(self, "Already Logged In", "This account is already logged in on another device.")
-                return
+        if not user:
+            QMessageBox.critical(self, "Login Failed", "Invalid username or password.")
+            return
 
-            if verify_password(user[2], password):
-                db_query("UPDATE users SET logged_in = 1 WHERE id = ?", (user[0],))
-                self.audit = AuditLogger(user[0])
-                self.close()
-                self.main_app = MainApplication(user)
-                self.main_app.show()
-                return
+        if user[4] == 1:  # already logged in
+            QMessageBox.warning(self, "Already Logged In", "This account is already logged in on another device.")
+            return
+
+        # bcrypt is deliberately slow; verify (and re-hash if the cost changed) off the UI thread
+        self.set_busy(True)
+        run_in_background(
+            verify_and_upgrade, user[2], password,
+            on_result=lambda outcome: self.finish_login(user, outcome),
+            on_error=self.login_error,
+        )
+
+    def set_busy(self, busy):
+        self.login_button.setEnabled(not busy)
+        self.username_entry.setEnabled(not busy)
+        self.password_entry.setEnabled(not busy)
+        self.busy_indicator.setVisible(busy)
+        if busy:
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+        else:
+            QApplication.restoreOverrideCursor()
+
+    def finish_login(self, user, outcome):
+        self.set_busy(False)
+        ok, new_hash = outcome
+        if not ok:
+            QMessageBox.critical(self, "Login Failed", "Invalid username or password.")
+            return
+
+        if new_hash is not None:
+            db_query("UPDATE users SET password_hash = ? WHERE id = ?", (new_hash, user[0]))
+        db_query("UPDATE users SET logged_in = 1 WHERE id = ?", (user[0],))
+        self.audit = AuditLogger(user[0])
+        self.audit.log("login")
+        self.close()
+        self.main_app = MainApplication(user)
+        self.main_app.show()
+        self.main_app.start_reminder_alerts()
 
-        QMessageBox.critical(self, "Login Failed", "Invalid username or password.")
+    def login_error(self, message):
+        self.set_busy(False)
+        QMessageBox.critical(self, "Login Failed", f"Could not verify password: {message}")
 
 # --- App Execution ---
 if __name__ == "__main__":
     import traceback
     try:
         app = QApplication(sys.argv)
+        start_services()
         login_window = LoginWindow()
         login_window.show()
         app.exec()
+        stop_reminders()
+        stop_file_indexer()
+        stop_notification_retention()
+        shutdown_text_indexer()
+        shutdown_audit_writer()
+        close_all_connections()
     except Exception as e:
         with open("error_log.txt", "w") as f:
             traceback.print_exc(file=f)
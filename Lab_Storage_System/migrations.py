@@ -0,0 +1,359 @@
+# migrations.py
+# Single source of truth for the storage.db schema. Each step runs once, in
+# order, inside its own transaction and bumps PRAGMA user_version, so a
+# current database costs one pragma read at startup.
+from datetime import datetime, timezone
+
+from db import get_connection, transaction
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _add_column(conn, table, column, declaration):
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+def _baseline(conn):
+    """Tables the GUI used to create at import time, plus the columns it probed for."""
+    tables = [
+        '''CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            equipment_id INTEGER,
+            task TEXT,
+            scheduled_by TEXT,
+            scheduled_at TEXT,
+            acknowledged_by TEXT,
+            acknowledged_at TEXT,
+            scheduled_for TEXT,
+            FOREIGN KEY (equipment_id) REFERENCES equipment(id)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS engineer_reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            uploaded_by TEXT NOT NULL,
+            uploaded_at TEXT NOT NULL,
+            approved INTEGER DEFAULT 0,  -- 0 = pending, 1 = approved
+            rejected INTEGER DEFAULT 0
+        )''',
+        '''CREATE TABLE IF NOT EXISTS equipment (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            next_maintenance DATE,
+            equipment_num TEXT,
+            description TEXT,
+            completed INTEGER DEFAULT 0
+        )''',
+        '''CREATE TABLE IF NOT EXISTS quotations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer TEXT NOT NULL,
+            service TEXT NOT NULL,
+            price REAL NOT NULL,
+            date DATE NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS specifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            equipment_id INTEGER NOT NULL,
+            report_path TEXT NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL,
+            logged_in INTEGER DEFAULT 0
+        )''',
+        '''CREATE TABLE IF NOT EXISTS procedures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            upload_date DATE NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message TEXT NOT NULL,
+            user_role TEXT,  -- null = visible to all
+            created_at TEXT NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS tests (
+            id INTEGER PRIMARY KEY,
+            equipment_id INTEGER,
+            test_date DATE,
+            result TEXT,
+            FOREIGN KEY (equipment_id) REFERENCES equipment(id)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS upload_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT,
+            folder TEXT,
+            uploaded_by TEXT,
+            uploaded_at TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS audit_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            action TEXT,
+            details TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )''',
+    ]
+    for sql in tables:
+        conn.execute(sql)
+
+    # Older databases were created before these columns existed
+    _add_column(conn, "users", "logged_in", "INTEGER DEFAULT 0")
+    _add_column(conn, "engineer_reports", "rejected", "INTEGER DEFAULT 0")
+    _add_column(conn, "maintenance_log", "scheduled_for", "TEXT")
+    _add_column(conn, "equipment", "equipment_num", "TEXT")
+
+
+def _equipment_intervals(conn):
+    """Columns from the old schema.py that the CLI scheduler writes to."""
+    _add_column(conn, "equipment", "last_maintenance", "DATE")
+    _add_column(conn, "equipment", "maintenance_interval", "INTEGER")
+
+
+def _hot_query_indexes(conn):
+    """Indexes behind the GUI's list views and the login lookup (see check_indexes.py)."""
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_maintenance_log_pending
+                    ON maintenance_log(scheduled_for) WHERE acknowledged_by IS NULL''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_maintenance_log_scheduled_at ON maintenance_log(scheduled_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notifications_role ON notifications(user_role, created_at, message)")
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_engineer_reports_pending
+                    ON engineer_reports(id, filename, uploaded_by, uploaded_at) WHERE approved = 0''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_equipment_num ON equipment(equipment_num)")
+
+    # Logins look users up by name; make it unique unless old data already has duplicates
+    duplicate = conn.execute(
+        "SELECT username FROM users GROUP BY username HAVING COUNT(*) > 1 LIMIT 1"
+    ).fetchone()
+    if duplicate:
+        print(f"[MIGRATION] Duplicate username '{duplicate[0]}'; users.username index will not be unique.")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
+    else:
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users(username)")
+
+
+def _partition_audit_log(conn):
+    """Split audit_log into monthly tables; audit_log becomes a view over them."""
+    from audit_partitions import ensure_partition, rebuild_view
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS audit_partitions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        month TEXT NOT NULL,            -- 'YYYY-MM'
+        table_name TEXT NOT NULL,
+        archive_path TEXT,              -- NULL while the table is hot
+        row_count INTEGER
+    )''')
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_partitions_hot
+                    ON audit_partitions(month) WHERE archive_path IS NULL''')
+    # One id source for every partition, so ids stay unique across the view
+    conn.execute('''CREATE TABLE IF NOT EXISTS audit_sequence (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_id INTEGER NOT NULL
+    )''')
+
+    is_table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'audit_log'").fetchone()
+    if is_table:
+        conn.execute("ALTER TABLE audit_log RENAME TO audit_log_unpartitioned")
+        # Rows without a timestamp are kept, filed under the migration time
+        # (UTC, like CURRENT_TIMESTAMP and AuditLogger)
+        migrated_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        stamp = "COALESCE(NULLIF(timestamp, ''), ?)"
+        months = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT substr({stamp}, 1, 7) FROM audit_log_unpartitioned", (migrated_at,))]
+        for month in months:
+            name = ensure_partition(conn, month)
+            conn.execute(f'''INSERT INTO {name} (id, user_id, action, details, timestamp)
+                            SELECT id, user_id, action, details, {stamp} FROM audit_log_unpartitioned
+                            WHERE substr({stamp}, 1, 7) = ? ORDER BY id''', (migrated_at, migrated_at, month))
+        # Continue after the highest id the old table ever handed out
+        last_id = max(
+            conn.execute("SELECT COALESCE(MAX(id), 0) FROM audit_log_unpartitioned").fetchone()[0],
+            conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'audit_log'").fetchone()[0])
+        conn.execute("INSERT OR REPLACE INTO audit_sequence (id, last_id) VALUES (1, ?)", (last_id,))
+        conn.execute("DROP TABLE audit_log_unpartitioned")
+    rebuild_view(conn)
+
+
+def _blob_store(conn):
+    """Content-addressed storage for uploads (see blob_store.py)."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS blobs (
+        sha256 TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        ref_count INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS blob_refs (
+        path TEXT PRIMARY KEY,          -- folder entry, e.g. uploaded_reports/DVPR/x.pdf
+        sha256 TEXT NOT NULL REFERENCES blobs(sha256)
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_blob_refs_sha256 ON blob_refs(sha256)")
+
+
+def _upload_log_checksums(conn):
+    """Record size and SHA-256 with each upload so views needn't stat the files."""
+    _add_column(conn, "upload_log", "size", "INTEGER")
+    _add_column(conn, "upload_log", "sha256", "TEXT")
+
+
+def _file_index(conn):
+    """Index of the report/procedure trees so browser dialogs needn't list directories."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,          -- e.g. uploaded_reports/DVPR/x.pdf
+        root TEXT NOT NULL,             -- one of file_index.INDEXED_ROOTS
+        folder TEXT,                    -- parent relative to root, '' at the top, NULL for the root itself
+        name TEXT NOT NULL,
+        is_dir INTEGER NOT NULL DEFAULT 0,
+        size INTEGER,
+        mtime REAL NOT NULL,            -- directories: mtime when last listed
+        type TEXT                       -- lower-case extension, 'dir' for folders
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_files_folder ON files(root, folder, name)")
+
+
+def _document_search(conn):
+    """FTS5 index of text extracted from stored documents (see text_search.py)."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY,         -- rowid of the document's documents_fts row
+        path TEXT NOT NULL UNIQUE,
+        size INTEGER,
+        mtime REAL,                     -- size/mtime the text was extracted from
+        indexed_at TEXT NOT NULL
+    )''')
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts
+                    USING fts5(name, body, tokenize = 'porter unicode61 remove_diacritics 2')''')
+
+
+def _keyset_indexes(conn):
+    """Indexes matching paged_model's keyset ORDER BYs (nullable keys are COALESCEd)."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_maintenance_log_keyset ON maintenance_log(COALESCE(scheduled_at, ''), id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_equipment_keyset ON equipment(COALESCE(equipment_num, ''), id)")
+
+
+def _calendar_month_index(conn):
+    """Range lookups of a calendar page's tasks (see calendar_months.py)."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_maintenance_log_scheduled_for ON maintenance_log(scheduled_for)")
+
+
+def _maintenance_rules(conn):
+    """Recurring maintenance (see recurrence.py); only acknowledged occurrences reach maintenance_log."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS maintenance_rules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        equipment_id INTEGER NOT NULL REFERENCES equipment(id),
+        task TEXT,
+        rule TEXT NOT NULL,             -- e.g. FREQ=MONTHLY;INTERVAL=3
+        starts_on TEXT NOT NULL,        -- first occurrence, YYYY-MM-DD
+        created_by TEXT,
+        created_at TEXT NOT NULL,
+        active INTEGER NOT NULL DEFAULT 1
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_maintenance_rules_equipment ON maintenance_rules(equipment_id)")
+    _add_column(conn, "maintenance_log", "rule_id", "INTEGER REFERENCES maintenance_rules(id)")
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_maintenance_log_occurrence
+                    ON maintenance_log(rule_id, scheduled_for) WHERE rule_id IS NOT NULL''')
+    # Intervals the CLI recorded become rules starting at the next due date
+    conn.execute('''INSERT INTO maintenance_rules (equipment_id, task, rule, starts_on, created_by, created_at)
+                    SELECT id, description, 'FREQ=DAILY;INTERVAL=' || maintenance_interval,
+                           next_maintenance, 'migration', datetime('now', 'localtime')
+                    FROM equipment
+                    WHERE maintenance_interval > 0 AND next_maintenance IS NOT NULL''')
+
+
+def _dashboard_stats(conn):
+    """Trigger-maintained dashboard counters (see dashboard_stats.py)."""
+    from dashboard_stats import create_stats
+    create_stats(conn)
+
+
+def _notification_reads(conn):
+    """Per-user read cursors for the notification feed (see notification_feed.py)."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS notification_reads (
+        user_id INTEGER PRIMARY KEY REFERENCES users(id),
+        last_seen_id INTEGER NOT NULL DEFAULT 0  -- newest notifications.id the user has seen
+    )''')
+
+
+def _notification_recipients(conn):
+    """Per-user fan-out of notifications, so a user's feed is one index range."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS notification_recipients (
+        user_id INTEGER NOT NULL,
+        notification_id INTEGER NOT NULL REFERENCES notifications(id),
+        PRIMARY KEY (user_id, notification_id)
+    ) WITHOUT ROWID''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_notification_recipients_notification
+                    ON notification_recipients(notification_id)''')
+    # Retention walks one role's notifications newest first
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notifications_role_id ON notifications(user_role, id)")
+    # Every insert path fans out to the users of the role (everyone if NULL)
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_notifications_fan_out AFTER INSERT ON notifications BEGIN
+        INSERT INTO notification_recipients (user_id, notification_id)
+        SELECT id, NEW.id FROM users WHERE NEW.user_role IS NULL OR role = NEW.user_role;
+    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_notifications_fan_out_delete AFTER DELETE ON notifications BEGIN
+        DELETE FROM notification_recipients WHERE notification_id = OLD.id;
+    END''')
+    conn.execute('''INSERT OR IGNORE INTO notification_recipients (user_id, notification_id)
+                    SELECT u.id, n.id FROM notifications n
+                    JOIN users u ON n.user_role IS NULL OR u.role = n.user_role''')
+
+
+def _notification_recipient_column(conn):
+    """Notifications addressed to one user (recipient_id) instead of a whole role."""
+    _add_column(conn, "notifications", "recipient_id", "INTEGER REFERENCES users(id)")
+    conn.execute("DROP TRIGGER IF EXISTS trg_notifications_fan_out")
+    conn.execute('''CREATE TRIGGER trg_notifications_fan_out AFTER INSERT ON notifications BEGIN
+        INSERT INTO notification_recipients (user_id, notification_id)
+        SELECT id, NEW.id FROM users
+        WHERE CASE WHEN NEW.recipient_id IS NOT NULL THEN id = NEW.recipient_id
+                   ELSE NEW.user_role IS NULL OR role = NEW.user_role END;
+    END''')
+
+
+# (version, description, step) — append only, never renumber
+MIGRATIONS = [
+    (1, "baseline tables", _baseline),
+    (2, "equipment maintenance intervals", _equipment_intervals),
+    (3, "indexes for hot GUI queries", _hot_query_indexes),
+    (4, "monthly audit_log partitions", _partition_audit_log),
+    (5, "content-addressed upload blobs", _blob_store),
+    (6, "upload_log size and checksum", _upload_log_checksums),
+    (7, "filesystem index for report/procedure trees", _file_index),
+    (8, "full-text document search", _document_search),
+    (9, "keyset pagination indexes", _keyset_indexes),
+    (10, "calendar month index", _calendar_month_index),
+    (11, "recurring maintenance rules", _maintenance_rules),
+    (12, "dashboard counters", _dashboard_stats),
+    (13, "notification read cursors", _notification_reads),
+    (14, "notification fan-out and retention indexes", _notification_recipients),
+    (15, "personal notifications", _notification_recipient_column),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version():
+    return get_connection().execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate():
+    """Bring the database up to SCHEMA_VERSION; returns the resulting version."""
+    if schema_version() >= SCHEMA_VERSION:
+        return SCHEMA_VERSION
+
+    for version, _description, step in MIGRATIONS:
+        with transaction() as conn:
+            # Re-read inside the write lock in case another client migrated first
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+    return SCHEMA_VERSION
+
+
+if __name__ == "__main__":
+    before = schema_version()
+    after = migrate()
+    print(f"Schema version {before} -> {after}")
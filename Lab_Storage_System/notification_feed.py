@@ -0,0 +1,61 @@
+# notification_feed.py
+# Unread notifications per user. A trigger fans every notification out to
+# notification_recipients (user_id, notification_id), so a user's feed is a
+# range of that table's primary key rather than an OR user_role IS NULL scan
+# over everyone's notifications. notification_reads keeps each user's read
+# cursor: the id of the newest notification they have seen. Ids only grow,
+# so "what's new" is WHERE notification_id > ?, and a poll that finds
+# nothing costs one seek however many notifications exist. The GUI polls
+# only after PRAGMA data_version (or a local commit) says the database
+# changed; see MainApplication.poll_notifications.
+from collections import namedtuple
+
+from db import db_query
+
+FEED_BATCH = 100       # new notifications fetched per query
+UNREAD_DISPLAY_CAP = 99  # the badge shows "99+" beyond this
+
+Notification = namedtuple("Notification", "id created_at message")
+
+NEW_NOTIFICATIONS_SQL = '''
+    SELECT n.id, n.created_at, n.message
+    FROM notification_recipients r JOIN notifications n ON n.id = r.notification_id
+    WHERE r.user_id = ? AND r.notification_id > ?
+    ORDER BY r.notification_id LIMIT ?
+'''
+
+
+def read_cursor(user_id):
+    """Id of the newest notification user_id has seen (0 if none)."""
+    row = db_query("SELECT last_seen_id FROM notification_reads WHERE user_id = ?", (user_id,), fetchone=True)
+    return row[0] if row else 0
+
+
+def mark_read(user_id, last_id):
+    """Move user_id's cursor forward to last_id (never backwards)."""
+    db_query('''INSERT INTO notification_reads (user_id, last_seen_id) VALUES (?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET last_seen_id = MAX(last_seen_id, excluded.last_seen_id)''',
+             (user_id, last_id))
+
+
+def new_notifications(user_id, after_id, limit=FEED_BATCH):
+    """[Notification] delivered to user_id with id > after_id, oldest first, at most limit."""
+    return [Notification(*row) for row in db_query(NEW_NOTIFICATIONS_SQL, (user_id, after_id, limit))]
+
+
+def unread_count(user_id, after_id, up_to_id, cap=UNREAD_DISPLAY_CAP + 1):
+    """Notifications in (after_id, up_to_id] delivered to user_id, counting no further than cap."""
+    row = db_query('''SELECT COUNT(*) FROM (SELECT 1 FROM notification_recipients
+                      WHERE user_id = ? AND notification_id > ? AND notification_id <= ? LIMIT ?)''',
+                   (user_id, after_id, up_to_id, cap), fetchone=True)
+    return row[0] if row else 0
+
+
+def newest_id():
+    """Id of the newest notification for any user (0 if there are none)."""
+    row = db_query("SELECT MAX(id) FROM notifications", fetchone=True)
+    return (row[0] or 0) if row else 0
+
+
+def badge_text(count):
+    return f"{UNREAD_DISPLAY_CAP}+" if count > UNREAD_DISPLAY_CAP else str(count)
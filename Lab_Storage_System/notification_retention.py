@@ -0,0 +1,130 @@
+# notification_retention.py
+# Keeps the notifications table bounded. For each user_role (NULL = sent to
+# everyone) config.NOTIFICATION_RETENTION gives a maximum age and a maximum
+# number of notifications to keep; anything older or beyond the newest
+# max_count is written to a gzip'd JSON-lines file under
+# NOTIFICATION_ARCHIVE_DIR first and then deleted in one short transaction
+# (a delete trigger drops the fan-out rows), so writers are never blocked
+# while the archive is compressed.
+# RetentionThread runs compact_notifications() once a day; it can also be
+# run by hand: python notification_retention.py.
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from config import NOTIFICATION_RETENTION
+from db import db_query, get_connection, transaction
+
+NOTIFICATION_ARCHIVE_DIR = "notification_archive"
+RETENTION_INTERVAL = 24 * 3600  # seconds between compaction passes
+DELETE_BATCH = 500              # ids per DELETE statement
+
+
+def retention_for(user_role):
+    """(max age in days, max count) for user_role."""
+    return NOTIFICATION_RETENTION.get(user_role, NOTIFICATION_RETENTION[None])
+
+
+def _expired_ids(conn, user_role, max_age_days, max_count, now):
+    """Ids of user_role's notifications that are too old or beyond the newest max_count."""
+    cutoff = (now - timedelta(days=max_age_days)).strftime('%Y-%m-%d %H:%M:%S')
+    row = conn.execute('''SELECT id FROM notifications WHERE user_role IS ?
+                          ORDER BY id DESC LIMIT 1 OFFSET ?''', (user_role, max_count)).fetchone()
+    newest_surplus = row[0] if row else 0
+    return [nid for (nid,) in conn.execute(
+        "SELECT id FROM notifications WHERE user_role IS ? AND (id <= ? OR created_at < ?) ORDER BY id",
+        (user_role, newest_surplus, cutoff))]
+
+
+def _archive_path(archive_dir, now):
+    path = os.path.join(archive_dir, f"notifications_{now:%Y%m%d_%H%M%S}.jsonl.gz")
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = os.path.join(archive_dir, f"notifications_{now:%Y%m%d_%H%M%S}.{suffix}.jsonl.gz")
+    return path
+
+
+def compact_notifications(now=None, archive_dir=NOTIFICATION_ARCHIVE_DIR):
+    """Archive and delete every notification outside its role's retention; returns how many."""
+    now = now or datetime.now()
+    conn = get_connection()
+    roles = [row[0] for row in conn.execute("SELECT DISTINCT user_role FROM notifications")]
+    expired = []
+    for role in roles:
+        expired += _expired_ids(conn, role, *retention_for(role), now)
+    if not expired:
+        return 0
+    os.makedirs(archive_dir, exist_ok=True)
+    path = _archive_path(archive_dir, now)
+    tmp_path = path + ".tmp"
+    archived = []  # only rows that made it into the file are deleted
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        for start in range(0, len(expired), DELETE_BATCH):
+            batch = expired[start:start + DELETE_BATCH]
+            placeholders = ", ".join("?" for _ in batch)
+            for row in conn.execute(f'''SELECT id, message, user_role, created_at FROM notifications
+                                        WHERE id IN ({placeholders}) ORDER BY id''', batch):
+                f.write(json.dumps(row) + "\n")
+                archived.append(row[0])
+    os.replace(tmp_path, path)
+    try:
+        with transaction():
+            for start in range(0, len(archived), DELETE_BATCH):
+                batch = archived[start:start + DELETE_BATCH]
+                placeholders = ", ".join("?" for _ in batch)
+                db_query(f"DELETE FROM notifications WHERE id IN ({placeholders})", batch)
+    except sqlite3.Error:
+        # Nothing was deleted; drop the file so the next pass doesn't archive them twice
+        os.remove(path)
+        raise
+    print(f"[NOTIFICATIONS] Archived {len(archived)} notification(s) to {path}")
+    return len(archived)
+
+
+class RetentionThread(threading.Thread):
+    """Runs compact_notifications() at start-up and then every interval seconds."""
+
+    def __init__(self, interval=RETENTION_INTERVAL):
+        super().__init__(name="notification-retention", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                compact_notifications()
+            except (OSError, sqlite3.Error) as e:
+                print(f"[NOTIFICATIONS ERROR] Compaction failed: {e}")
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_retention = None
+
+
+def start_notification_retention():
+    global _retention
+    if _retention is None or not _retention.is_alive():
+        _retention = RetentionThread()
+        _retention.start()
+    return _retention
+
+
+def stop_notification_retention():
+    global _retention
+    retention, _retention = _retention, None
+    if retention is not None:
+        retention.stop()
+        retention.join(timeout=5)
+
+
+if __name__ == "__main__":
+    from migrations import migrate
+    migrate()
+    print(f"Archived {compact_notifications()} notification(s).")
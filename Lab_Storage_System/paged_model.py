@@ -0,0 +1,153 @@
+# paged_model.py
+# Read-only Qt table model that loads a query a page at a time. Views ask
+# for more rows through canFetchMore()/fetchMore() as the user scrolls, and
+# each page is fetched on the db_async pool with keyset pagination
+# ("rows after the last key I have", not OFFSET), so every page costs the
+# same index seek however far down the list it is.
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from db_async import run_query
+
+PAGE_SIZE = 100
+
+
+def keyset_sql(columns, from_clause, order_by, where=None, descending=False, after_key=False):
+    """SELECT for one page: display columns followed by the key columns.
+
+    order_by must be unique per row (end it with the primary key) and
+    never NULL (wrap nullable columns in COALESCE). The page's parameters
+    are where's, then keyset_params(previous page's last key) if after_key,
+    then the page size.
+    """
+    conditions = [f"({where})"] if where else []
+    if after_key:
+        op = "<" if descending else ">"
+        if len(order_by) > 1:
+            # Redundant bound on the leading column alone lets SQLite seek
+            # the index; it can't range-scan on a row value over expressions
+            conditions.append(f"{order_by[0]} {op}= ?")
+        conditions.append(f"({', '.join(order_by)}) {op} ({', '.join('?' for _ in order_by)})")
+    direction = " DESC" if descending else ""
+    sql = f"SELECT {', '.join(list(columns) + list(order_by))} FROM {from_clause}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + ", ".join(expr + direction for expr in order_by)
+    return sql + " LIMIT ?"
+
+
+def keyset_params(last_key):
+    """Parameters for keyset_sql's after_key condition."""
+    return (last_key[0],) + tuple(last_key) if len(last_key) > 1 else tuple(last_key)
+
+
+class KeysetTableModel(QAbstractTableModel):
+    """Pages of (columns...) rows from from_clause, ordered by the order_by key.
+
+    formatters optionally maps a column index to a function turning the raw
+    value into display text. owner (usually the dialog) cancels a page load
+    still in flight when it closes; tables, as for run_query, serves repeat
+    page loads from db's read cache.
+    """
+
+    def __init__(self, columns, from_clause, order_by, headers, where=None, params=(),
+                 descending=False, page_size=PAGE_SIZE, formatters=None, owner=None, tables=(), parent=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self.headers = list(headers)
+        self.params = tuple(params)
+        self.page_size = page_size
+        self.formatters = formatters or {}
+        self.owner = owner
+        self.tables = tables
+        self._first_sql = keyset_sql(columns, from_clause, order_by, where, descending)
+        self._next_sql = keyset_sql(columns, from_clause, order_by, where, descending, after_key=True)
+        self._rows = []
+        self._last_key = None
+        self._exhausted = False
+        self._loading = False
+        self._generation = 0  # bumped by reload() so a stale page is ignored
+
+    # --- Qt model interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self.headers):
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        value = self._rows[index.row()][index.column()]
+        if role == Qt.DisplayRole:
+            formatter = self.formatters.get(index.column())
+            if formatter is not None:
+                return formatter(value)
+            return "" if value is None else str(value)
+        if role == Qt.UserRole:
+            return value
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._loading:
+            return
+        self._loading = True
+        generation = self._generation
+        if self._last_key is None:
+            sql, params = self._first_sql, self.params + (self.page_size,)
+        else:
+            sql, params = self._next_sql, self.params + keyset_params(self._last_key) + (self.page_size,)
+        run_query(sql, params, owner=self.owner, tables=self.tables,
+                  on_result=lambda rows: self._append(generation, rows),
+                  on_error=lambda message: self._failed(generation, message))
+
+    # --- helpers ---
+    def _append(self, generation, rows):
+        if generation != self._generation:
+            return
+        self._loading = False
+        width = len(self.columns)
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if not rows:
+            return
+        self._last_key = tuple(rows[-1][width:])
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._rows.extend(tuple(row[:width]) for row in rows)
+        self.endInsertRows()
+
+    def _failed(self, generation, message):
+        if generation != self._generation:
+            return
+        self._loading = False
+        self._exhausted = True
+        print(f"Database Error: {message}")
+
+    def row_values(self, row):
+        """The raw column values of a loaded row."""
+        return self._rows[row]
+
+    def remove_row(self, row):
+        """Drop a loaded row after the record behind it was changed elsewhere."""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self.endRemoveRows()
+
+    def reload(self):
+        """Forget the loaded pages and start again from the first one."""
+        self._generation += 1
+        self.beginResetModel()
+        self._rows = []
+        self._last_key = None
+        self._exhausted = False
+        self._loading = False
+        self.endResetModel()
+        self.fetchMore()
@@ -0,0 +1,331 @@
+# recurrence.py
+# Recurring maintenance. A row in maintenance_rules says "this task on this
+# equipment repeats by this rule from starts_on"; its occurrences are never
+# stored up front. expand() computes the dates falling in whatever window a
+# view or the reminder engine asks for, jumping straight to the window
+# instead of walking from starts_on. Only an acknowledged occurrence is
+# written to maintenance_log (with rule_id set), and expansion skips dates
+# that already have such a row, so the pending schedule is always derived.
+# Pending occurrences are listed from each rule's last acknowledged one (or
+# from the first it skipped), so missed maintenance never ages out of view.
+#
+# Rules use a small RRULE subset: FREQ=DAILY|WEEKLY|MONTHLY|YEARLY, INTERVAL,
+# BYDAY (weekly only, e.g. MO,TH), COUNT and UNTIL (inclusive, YYYY-MM-DD or
+# YYYYMMDD). A bare number means every that many days. Monthly and yearly
+# dates past the end of a short month fall on its last day.
+import calendar
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from db import cached_query, db_query, transaction
+
+SCHEDULE_HORIZON_DAYS = 90      # how far ahead the schedule view lists occurrences
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+RULE_TABLES = ("maintenance_rules", "equipment")
+
+Rule = namedtuple("Rule", "freq interval byday count until")
+Occurrence = namedtuple(
+    "Occurrence",
+    "rule_id equipment_id equipment_num equipment_name task due log_id acknowledged_by acknowledged_at")
+
+
+def _parse_day(value):
+    value = value.strip()
+    if len(value) >= 8 and value[:8].isdigit():
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    return date.fromisoformat(value[:10])
+
+
+def parse_rule(text):
+    """Rule from RRULE-style text or a bare number of days; raises ValueError if invalid."""
+    text = (text or "").strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[6:]
+    if text.isdigit():
+        text = f"FREQ=DAILY;INTERVAL={text}"
+    parts = {}
+    for part in filter(None, text.upper().split(";")):
+        key, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"Malformed rule part '{part}'")
+        parts[key.strip()] = value.strip()
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    interval = int(parts.pop("INTERVAL", "1"))
+    if interval < 1:
+        raise ValueError("INTERVAL must be at least 1")
+    byday = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+        names = [name.strip() for name in parts.pop("BYDAY").split(",")]
+        if any(name not in WEEKDAYS for name in names):
+            raise ValueError(f"BYDAY takes {','.join(WEEKDAYS)}")
+        byday = tuple(sorted({WEEKDAYS.index(name) for name in names}))
+    count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+    if count is not None and count < 1:
+        raise ValueError("COUNT must be at least 1")
+    until = _parse_day(parts.pop("UNTIL")) if "UNTIL" in parts else None
+    if parts:
+        raise ValueError(f"Unsupported rule part(s): {', '.join(parts)}")
+    return Rule(freq, interval, byday, count, until)
+
+
+def format_rule(rule):
+    """Canonical text for a Rule, as stored in maintenance_rules.rule."""
+    text = f"FREQ={rule.freq};INTERVAL={rule.interval}"
+    if rule.byday:
+        text += ";BYDAY=" + ",".join(WEEKDAYS[day] for day in rule.byday)
+    if rule.count is not None:
+        text += f";COUNT={rule.count}"
+    if rule.until is not None:
+        text += f";UNTIL={rule.until.isoformat()}"
+    return text
+
+
+def describe_rule(text):
+    """Short human description, e.g. 'Every 30 days' or 'Every week on MO,TH'."""
+    try:
+        rule = parse_rule(text)
+    except ValueError:
+        return text
+    unit = {"DAILY": "day", "WEEKLY": "week", "MONTHLY": "month", "YEARLY": "year"}[rule.freq]
+    description = f"Every {unit}" if rule.interval == 1 else f"Every {rule.interval} {unit}s"
+    if rule.byday:
+        description += " on " + ",".join(WEEKDAYS[day] for day in rule.byday)
+    if rule.count is not None:
+        description += f", {rule.count} times"
+    if rule.until is not None:
+        description += f", until {rule.until.isoformat()}"
+    return description
+
+
+def _add_months(day, months):
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _period(rule, starts_on, k):
+    """Dates in the k-th period of the rule (before COUNT/UNTIL/starts_on filtering)."""
+    step = k * rule.interval
+    if rule.freq == "DAILY":
+        return [starts_on + timedelta(days=step)]
+    if rule.freq == "WEEKLY":
+        week = starts_on - timedelta(days=starts_on.weekday()) + timedelta(weeks=step)
+        return [week + timedelta(days=day) for day in (rule.byday or (starts_on.weekday(),))]
+    if rule.freq == "MONTHLY":
+        return [_add_months(starts_on, step)]
+    return [_add_months(starts_on, 12 * step)]
+
+
+def _first_period(rule, starts_on, start):
+    """Index of the period containing start (0 if start is before starts_on)."""
+    if start <= starts_on:
+        return 0
+    if rule.freq == "DAILY":
+        return (start - starts_on).days // rule.interval
+    if rule.freq == "WEEKLY":
+        week = starts_on - timedelta(days=starts_on.weekday())
+        return (start - week).days // 7 // rule.interval
+    if rule.freq == "MONTHLY":
+        months = (start.year - starts_on.year) * 12 + start.month - starts_on.month
+        return max(0, months // rule.interval)
+    return max(0, (start.year - starts_on.year) // rule.interval)
+
+
+def expand(rule, starts_on, start, end):
+    """Occurrence dates of rule in [start, end), in order, computed lazily."""
+    if isinstance(rule, str):
+        rule = parse_rule(rule)
+    k = _first_period(rule, starts_on, start)
+    skipped_first = sum(1 for day in _period(rule, starts_on, 0) if day < starts_on)
+    # Occurrences in periods before k, for COUNT
+    index = k * len(_period(rule, starts_on, 0)) - (skipped_first if k > 0 else 0)
+    while True:
+        for day in _period(rule, starts_on, k):
+            if day < starts_on:
+                continue
+            if (rule.count is not None and index >= rule.count) or \
+                    (rule.until is not None and day > rule.until) or day >= end:
+                return
+            index += 1
+            if day >= start:
+                yield day
+        k += 1
+
+
+def next_occurrence(rule, starts_on, on_or_after):
+    return next(expand(rule, starts_on, on_or_after, date.max), None)
+
+
+def _count_before(rule, starts_on, day):
+    """How many occurrences of rule fall before day, without walking from starts_on."""
+    if rule.until is not None:
+        day = min(day, rule.until + timedelta(days=1))
+    k = _first_period(rule, starts_on, day)
+    skipped_first = sum(1 for d in _period(rule, starts_on, 0) if d < starts_on)
+    index = k * len(_period(rule, starts_on, 0)) - (skipped_first if k > 0 else 0)
+    index += sum(1 for d in _period(rule, starts_on, k) if starts_on <= d < day)
+    return index if rule.count is None else min(index, rule.count)
+
+
+def _pending_window(rule, starts_on, last, count, acknowledged_days):
+    """(day to expand from, acknowledged 'yyyy-mm-dd' still to skip) for one rule.
+
+    last and count summarise the rule's acknowledged occurrences. If they are
+    exactly the occurrences up to last, pending ones start the day after it;
+    otherwise one was skipped and the window starts there instead.
+    acknowledged_days() returns the full set and is only called in that case.
+    """
+    if last is None:
+        return starts_on, frozenset()
+    after = last + timedelta(days=1)
+    if count == _count_before(rule, starts_on, after):
+        return after, frozenset()
+    done = acknowledged_days()
+    for day in expand(rule, starts_on, starts_on, last):
+        if day.isoformat() not in done:
+            return day, done
+    return after, frozenset()
+
+
+def active_rules():
+    """[(rule_id, equipment_id, equipment_num, equipment_name, task, rule, starts_on)] of active rules."""
+    rows = cached_query('''
+        SELECT r.id, r.equipment_id, eq.equipment_num, eq.name, r.task, r.rule, r.starts_on
+        FROM maintenance_rules r
+        LEFT JOIN equipment eq ON r.equipment_id = eq.id
+        WHERE r.active = 1
+    ''', tables=RULE_TABLES)
+    rules = []
+    for rule_id, equipment_id, eq_num, eq_name, task, text, starts_on in rows:
+        try:
+            rules.append((rule_id, equipment_id, eq_num, eq_name, task, parse_rule(text),
+                          date.fromisoformat(starts_on[:10])))
+        except (TypeError, ValueError) as e:
+            print(f"[RECURRENCE] Skipping rule {rule_id}: {e}")
+    return rules
+
+
+def _recorded(start, end):
+    """{(rule_id, 'yyyy-mm-dd'): (log_id, acknowledged_by, acknowledged_at)} persisted in [start, end)."""
+    rows = cached_query('''
+        SELECT rule_id, scheduled_for, id, acknowledged_by, acknowledged_at FROM maintenance_log
+        WHERE scheduled_for >= ? AND scheduled_for < ? AND rule_id IS NOT NULL
+    ''', (start.isoformat(), end.isoformat()), tables=("maintenance_log",))
+    return {(rule_id, day[:10]): (log_id, ack_by, ack_at) for rule_id, day, log_id, ack_by, ack_at in rows}
+
+
+def _acknowledged():
+    """{rule_id: (last acknowledged date, number acknowledged)}."""
+    rows = cached_query('''
+        SELECT rule_id, MAX(scheduled_for), COUNT(*) FROM maintenance_log
+        WHERE rule_id IS NOT NULL AND acknowledged_by IS NOT NULL
+        GROUP BY rule_id
+    ''', tables=("maintenance_log",))
+    return {rule_id: (date.fromisoformat(last[:10]), count) for rule_id, last, count in rows}
+
+
+def _acknowledged_days(rule_id, read=cached_query, **kwargs):
+    rows = read('''
+        SELECT scheduled_for FROM maintenance_log WHERE rule_id = ? AND acknowledged_by IS NOT NULL
+    ''', (rule_id,), **kwargs)
+    return {row[0][:10] for row in rows}
+
+
+def occurrences_between(start, end, pending_only=False):
+    """Every rule occurrence in [start, end), with acknowledgement details if recorded."""
+    recorded = _recorded(start, end)
+    occurrences = []
+    for rule_id, equipment_id, eq_num, eq_name, task, rule, starts_on in active_rules():
+        for day in expand(rule, starts_on, start, end):
+            log_id, ack_by, ack_at = recorded.get((rule_id, day.isoformat()), (None, None, None))
+            if pending_only and ack_by:
+                continue
+            occurrences.append(Occurrence(rule_id, equipment_id, eq_num, eq_name, task, day,
+                                          log_id, ack_by, ack_at))
+    occurrences.sort(key=lambda o: (o.due, o.rule_id))
+    return occurrences
+
+
+def pending_occurrences(today=None, horizon_days=SCHEDULE_HORIZON_DAYS):
+    """Unacknowledged occurrences up to horizon_days ahead, however long overdue."""
+    today = today or date.today()
+    end = today + timedelta(days=horizon_days + 1)
+    acknowledged = _acknowledged()
+    occurrences = []
+    for rule_id, equipment_id, eq_num, eq_name, task, rule, starts_on in active_rules():
+        last, count = acknowledged.get(rule_id, (None, 0))
+        start, done = _pending_window(rule, starts_on, last, count,
+                                      lambda: _acknowledged_days(rule_id, tables=("maintenance_log",)))
+        for day in expand(rule, starts_on, start, end):
+            if day.isoformat() not in done:
+                occurrences.append(Occurrence(rule_id, equipment_id, eq_num, eq_name, task, day,
+                                              None, None, None))
+    occurrences.sort(key=lambda o: (o.due, o.rule_id))
+    return occurrences
+
+
+def add_rule(equipment_id, task, rule_text, starts_on, created_by):
+    """Store a rule (validated and normalised); raises ValueError for a bad rule."""
+    rule = format_rule(parse_rule(rule_text))
+    db_query('''
+        INSERT INTO maintenance_rules (equipment_id, task, rule, starts_on, created_by, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (equipment_id, task, rule, str(starts_on)[:10], created_by,
+          datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+
+def acknowledge_occurrence(rule_id, due, user):
+    """Persist one occurrence as acknowledged (the only time occurrences are written).
+
+    In the same transaction the equipment's next_maintenance moves to the
+    rule's earliest occurrence still pending, which is before due if an
+    earlier one was skipped. Raises sqlite3.Error (nothing is
+    changed) if the transaction fails.
+    """
+    due = date.fromisoformat(str(due)[:10])
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with transaction():
+        db_query('''
+            INSERT INTO maintenance_log (equipment_id, task, scheduled_by, scheduled_at, scheduled_for,
+                                         acknowledged_by, acknowledged_at, rule_id)
+            SELECT equipment_id, task, created_by, created_at, ?, ?, ?, id FROM maintenance_rules WHERE id = ?
+            ON CONFLICT(rule_id, scheduled_for) WHERE rule_id IS NOT NULL
+            DO UPDATE SET acknowledged_by = excluded.acknowledged_by, acknowledged_at = excluded.acknowledged_at
+        ''', (due.isoformat(), user, now, rule_id))
+        row = db_query("SELECT equipment_id, rule, starts_on FROM maintenance_rules WHERE id = ?",
+                       (rule_id,), fetchone=True)
+        if not row:
+            return
+        rule, starts_on = parse_rule(row[1]), date.fromisoformat(row[2][:10])
+        last, count = db_query('''
+            SELECT MAX(scheduled_for), COUNT(*) FROM maintenance_log
+            WHERE rule_id = ? AND acknowledged_by IS NOT NULL
+        ''', (rule_id,), fetchone=True)
+        start, done = _pending_window(rule, starts_on, date.fromisoformat(last[:10]), count,
+                                      lambda: _acknowledged_days(rule_id, read=db_query))
+        following = next((day for day in expand(rule, starts_on, start, date.max)
+                          if day.isoformat() not in done), None)
+        if following is not None:
+            db_query("UPDATE equipment SET next_maintenance = ? WHERE id = ?", (following.isoformat(), row[0]))
+
+
+def end_rule(rule_id, last_day):
+    """Stop a rule after last_day (inclusive) by tightening its UNTIL; acknowledged history is kept."""
+    row = db_query("SELECT rule, starts_on FROM maintenance_rules WHERE id = ?", (rule_id,), fetchone=True)
+    if not row:
+        return
+    rule = parse_rule(row[0])
+    last_day = date.fromisoformat(str(last_day)[:10])
+    if rule.until is not None and rule.until <= last_day:
+        return
+    if last_day < date.fromisoformat(row[1][:10]):
+        db_query("UPDATE maintenance_rules SET active = 0 WHERE id = ?", (rule_id,))
+    else:
+        db_query("UPDATE maintenance_rules SET rule = ? WHERE id = ?",
+                 (format_rule(rule._replace(until=last_day)), rule_id))
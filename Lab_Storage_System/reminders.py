@@ -0,0 +1,166 @@
+# reminders.py
+# Maintenance reminders without polling. ReminderEngine keeps a heap of the
+# instants at which pending work becomes reminder-worthy (unacknowledged
+# maintenance_log.scheduled_for, equipment.next_maintenance and occurrences
+# of recurring rules, each REMINDER_LEAD_DAYS ahead at REMINDER_TIME) and
+# sleeps until the earliest. Rule occurrences are expanded only up to the
+# lead window; later ones come into range on a later reload.
+# A local commit to any of those tables re-arms it at once via db's commit
+# listeners; the sleep is capped at MAX_SLEEP so changes committed by other
+# processes (cli.py, another workstation) are picked up too. Anything still
+# pending after its reminder repeats once a day, like the old 09:00 job.
+# on_due(reminders) runs on the engine thread; the GUI forwards it to the Qt
+# main thread through a queued signal.
+import heapq
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+
+from db import add_commit_listener, get_connection, remove_commit_listener
+from recurrence import pending_occurrences
+
+REMINDER_LEAD_DAYS = 3
+REMINDER_TIME = time(9, 0)
+MAX_SLEEP = 3600.0  # seconds; bounds how late a change from another process is noticed
+WATCHED_TABLES = frozenset({"maintenance_log", "equipment", "maintenance_rules"})
+
+Reminder = namedtuple("Reminder", "kind item_id name due")
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def pending_reminders(conn, horizon_days=REMINDER_LEAD_DAYS + 1):
+    """Every unacknowledged task, equipment due date and rule occurrence (up to horizon_days ahead)."""
+    rows = conn.execute('''
+        SELECT 'task', ml.id, COALESCE(eq.name, 'Unknown equipment') || ': ' || COALESCE(ml.task, ''), ml.scheduled_for
+        FROM maintenance_log ml
+        LEFT JOIN equipment eq ON ml.equipment_id = eq.id
+        WHERE ml.acknowledged_by IS NULL AND ml.scheduled_for IS NOT NULL
+    ''').fetchall()
+    rows += conn.execute('''
+        SELECT 'equipment', id, name, next_maintenance FROM equipment
+        WHERE next_maintenance IS NOT NULL
+          AND id NOT IN (SELECT equipment_id FROM maintenance_rules WHERE active = 1)
+    ''').fetchall()
+    rows += [("rule", f"{o.rule_id}:{o.due.isoformat()}",
+              f"{o.equipment_name or 'Unknown equipment'}: {o.task or ''}", o.due)
+             for o in pending_occurrences(horizon_days=horizon_days)]
+    reminders = []
+    for kind, item_id, name, due in rows:
+        due = _parse_date(due)
+        if due is not None:
+            reminders.append(Reminder(kind, item_id, name, due))
+    return reminders
+
+
+class ReminderEngine(threading.Thread):
+    """Sleeps until the next reminder is due, then hands every due one to on_due."""
+
+    def __init__(self, on_due, lead_days=REMINDER_LEAD_DAYS, at=REMINDER_TIME):
+        super().__init__(name="reminders", daemon=True)
+        self.on_due = on_due
+        self.lead_days = lead_days
+        self.at = at
+        self.next_due = None       # earliest armed instant, for display/debugging
+        self._cond = threading.Condition()
+        self._dirty = True
+        self._stopped = False
+        self._reminded_on = {}     # (kind, item_id) -> date last reminded
+
+    def alert_time(self, reminder, now):
+        """When reminder should next be shown."""
+        lead = datetime.combine(reminder.due - timedelta(days=self.lead_days), self.at)
+        if lead > now:
+            return lead
+        if self._reminded_on.get((reminder.kind, reminder.item_id)) != now.date():
+            return now  # in the reminder window and not shown today yet
+        return datetime.combine(now.date() + timedelta(days=1), self.at)
+
+    def rearm(self, *_args):
+        """Recompute the schedule now (called after writes to the watched tables)."""
+        with self._cond:
+            self._dirty = True
+            self._cond.notify()
+
+    def _on_commit(self, tables):
+        if tables & WATCHED_TABLES:
+            self.rearm()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _load(self, now):
+        try:
+            reminders = pending_reminders(get_connection(), self.lead_days + 1)
+        except sqlite3.Error as e:
+            print(f"[REMINDER ERROR] Could not load schedules: {e}")
+            return []
+        live = {(r.kind, r.item_id) for r in reminders}
+        self._reminded_on = {key: day for key, day in self._reminded_on.items() if key in live}
+        heap = [(self.alert_time(r, now), index, r) for index, r in enumerate(reminders)]
+        heapq.heapify(heap)
+        return heap
+
+    def run(self):
+        add_commit_listener(self._on_commit)
+        try:
+            heap = []
+            while True:
+                with self._cond:
+                    if not self._dirty and not self._stopped:
+                        delay = MAX_SLEEP
+                        if heap:
+                            delay = min(delay, (heap[0][0] - datetime.now()).total_seconds())
+                        if delay > 0:
+                            self._cond.wait(delay)
+                    if self._stopped:
+                        return
+                    self._dirty = False
+
+                now = datetime.now()
+                heap = self._load(now)
+                due = []
+                while heap and heap[0][0] <= now:
+                    due.append(heapq.heappop(heap)[2])
+                if due:
+                    for reminder in due:
+                        self._reminded_on[(reminder.kind, reminder.item_id)] = now.date()
+                    try:
+                        self.on_due(sorted(due, key=lambda r: r.due))
+                    except Exception as e:
+                        print(f"[REMINDER ERROR] Delivering reminders failed: {e}")
+                    heap = self._load(now)
+                self.next_due = heap[0][0] if heap else None
+        finally:
+            remove_commit_listener(self._on_commit)
+
+
+def format_reminders(reminders):
+    return "\n".join(f"- {r.name} ({r.due.isoformat()})" for r in reminders)
+
+
+_engine = None
+
+
+def start_reminders(on_due):
+    global _engine
+    if _engine is None or not _engine.is_alive():
+        _engine = ReminderEngine(on_due)
+        _engine.start()
+    return _engine
+
+
+def stop_reminders():
+    global _engine
+    engine, _engine = _engine, None
+    if engine is not None:
+        engine.stop()
+        engine.join(timeout=5)
@@ -0,0 +1,105 @@
+# report_review.py
+# Batch approval and rejection of engineer_reports. The database side of a
+# batch (status changes plus one notification per engineer listing their
+# reports) is a single transaction; moving approved files into the chosen
+# approved/ folder is done separately by move_reports(), meant to run on a
+# background worker (workers.run_in_background(..., pass_task=True)).
+import os
+import sqlite3
+from collections import OrderedDict
+from datetime import datetime
+
+from db import db_execute_many, get_connection, transaction
+from file_index import record
+from storage_io import move_file
+from text_search import index_documents
+
+REPORTS_ROOT = "engineer_reports"
+APPROVED_ROOT = os.path.join(REPORTS_ROOT, "approved")
+NOTIFY_ROLE = "lab_engineer"
+LISTED_FILES = 10  # file names spelled out in one notification
+
+
+def _by_engineer(reports):
+    """OrderedDict uploaded_by -> [filename] for (report_id, filename, uploaded_by) tuples."""
+    grouped = OrderedDict()
+    for _, filename, uploaded_by in reports:
+        grouped.setdefault(uploaded_by, []).append(filename)
+    return grouped
+
+
+def _file_list(filenames):
+    listed = ", ".join(f"'{name}'" for name in filenames[:LISTED_FILES])
+    if len(filenames) > LISTED_FILES:
+        listed += f" and {len(filenames) - LISTED_FILES} more"
+    return listed
+
+
+def _notify_engineers(messages):
+    """Insert one notification per engineer; messages is [(username, text)].
+
+    Engineers with a user account get it personally (recipient_id); unknown
+    uploaders fall back to every lab engineer.
+    """
+    usernames = [username for username, _ in messages]
+    placeholders = ", ".join("?" for _ in usernames)
+    user_ids = dict(get_connection().execute(
+        f"SELECT username, id FROM users WHERE username IN ({placeholders})", usernames))
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    db_execute_many('''INSERT INTO notifications (message, user_role, recipient_id, created_at)
+                       VALUES (?, ?, ?, ?)''',
+                    [(text, NOTIFY_ROLE, user_ids.get(username), now) for username, text in messages])
+
+
+def approve_reports(reports, folder_name, approved_by):
+    """Mark reports approved and notify each engineer once; returns [(src, dst)] moves to perform.
+
+    reports is [(report_id, filename, uploaded_by)]. Raises sqlite3.Error
+    (nothing is changed) if the transaction fails.
+    """
+    if not reports:
+        return []
+    target_dir = os.path.join(APPROVED_ROOT, folder_name)
+    with transaction():
+        db_execute_many("UPDATE engineer_reports SET approved = 1 WHERE id = ?",
+                        [(report_id,) for report_id, _, _ in reports])
+        _notify_engineers([
+            (engineer, f"✅ {len(filenames)} of your test report(s) were approved by {approved_by} "
+                       f"and filed under '{folder_name}': {_file_list(filenames)}.")
+            for engineer, filenames in _by_engineer(reports).items()])
+    return [(os.path.join(REPORTS_ROOT, filename), os.path.join(target_dir, filename))
+            for _, filename, _ in reports]
+
+
+def reject_reports(reports, reason, rejected_by):
+    """Delete rejected reports' records and notify each engineer once, in one transaction."""
+    if not reports:
+        return
+    with transaction():
+        db_execute_many("DELETE FROM engineer_reports WHERE id = ?",
+                        [(report_id,) for report_id, _, _ in reports])
+        _notify_engineers([
+            (engineer, f"❌ {len(filenames)} of your test report(s) were rejected by {rejected_by}: "
+                       f"{_file_list(filenames)}. Reason: {reason}")
+            for engineer, filenames in _by_engineer(reports).items()])
+
+
+def move_reports(moves, task=None):
+    """Move approved files into place; returns (moved destinations, [(filename, reason)] failures).
+
+    Progress events are (done, total). Moved files are added to the file
+    index and queued for text search.
+    """
+    report = task.report if task is not None else (lambda value: None)
+    moved, failed = [], []
+    for done, (src, dst) in enumerate(moves, start=1):
+        try:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            move_file(src, dst)
+            record(dst)
+            moved.append(dst)
+        except (OSError, sqlite3.Error) as e:
+            failed.append((os.path.basename(src), str(e)))
+        report((done, len(moves)))
+    index_documents(moved)
+    return moved, failed
@@ -2,6 +2,12 @@
 
 import os
 import bcrypt
+from config import BCRYPT_ROUNDS
+
+def hash_password(plain_password, rounds=None):
+    """Hash a plaintext password with the configured bcrypt cost."""
+    salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
+    return bcrypt.hashpw(plain_password.encode('utf-8'), salt)
 
 def verify_password(stored_hash, plain_password):
     """Compare stored hash against a plaintext password input."""
@@ -9,6 +15,29 @@ def verify_password(stored_hash, plain_password):
         stored_hash = stored_hash.encode('utf-8')
     return bcrypt.checkpw(plain_password.encode('utf-8'), stored_hash)
 
+def hash_cost(stored_hash):
+    """Work factor encoded in a bcrypt hash ($2b$12$...), or None if unreadable."""
+    if isinstance(stored_hash, bytes):
+        stored_hash = stored_hash.decode('utf-8', 'replace')
+    parts = stored_hash.split('$')
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+def needs_rehash(stored_hash):
+    """True if the hash was made with a different cost than BCRYPT_ROUNDS."""
+    return hash_cost(stored_hash) != BCRYPT_ROUNDS
+
+def verify_and_upgrade(stored_hash, plain_password):
+    """Verify a password; returns (ok, new_hash) where new_hash is set only when
+    the stored hash should be replaced. Slow by design — keep off the UI thread."""
+    if not verify_password(stored_hash, plain_password):
+        return False, None
+    if needs_rehash(stored_hash):
+        return True, hash_password(plain_password)
+    return True, None
+
 def validate_pdf(file_path):
     """Check if the file is a valid PDF (by header)."""
     try:
@@ -0,0 +1,214 @@
+# text_search.py
+# Full-text search over the documents in the report/procedure trees. Text is
+# extracted in a pool of worker processes, so a big PDF stalls neither the
+# GUI nor other extractions, and stored in the documents_fts FTS5 table.
+# search() ranks matches with bm25 (path/name weighted above body text) and
+# returns a highlighted snippet for each.
+# PDF extraction needs pypdf (pip install pypdf, see README.md); without it
+# PDFs are indexed by path and name only, which the indexer logs and the
+# Search dialog points out (pdf_text_available()).
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from datetime import datetime
+
+from db import db_execute_many, db_query, get_connection, transaction
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+SEARCHABLE_EXTENSIONS = (".pdf", ".txt", ".csv", ".md")
+EXTRACT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+MAX_TEXT_CHARS = 2_000_000  # per document, so one huge scan can't bloat the index
+SEARCH_LIMIT = 50
+PDF_TEXT_MISSING = "PDF text search needs pypdf (pip install pypdf); PDFs are matched by file name only."
+
+SEARCH_SQL = '''SELECT d.path, snippet(documents_fts, 1, '[', ']', ' … ', 16)
+                FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+                WHERE documents_fts MATCH ?
+                ORDER BY bm25(documents_fts, 5.0, 1.0)
+                LIMIT ?'''
+
+
+def extract_text(path):
+    """Plain text of path, capped at MAX_TEXT_CHARS. Runs in a worker process."""
+    if os.path.splitext(path)[1].lower() != ".pdf":
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read(MAX_TEXT_CHARS)
+    if PdfReader is None:
+        return ""
+    parts = []
+    length = 0
+    for page in PdfReader(path).pages:
+        text = page.extract_text() or ""
+        parts.append(text)
+        length += len(text)
+        if length >= MAX_TEXT_CHARS:
+            break
+    return "\n".join(parts)[:MAX_TEXT_CHARS]
+
+
+def pdf_text_available():
+    return PdfReader is not None
+
+
+def store_document(path, size, mtime, text):
+    """Replace path's indexed text."""
+    conn = get_connection()
+    with transaction():
+        db_query('''INSERT INTO documents (path, size, mtime, indexed_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime,
+                        indexed_at = excluded.indexed_at''',
+                 (path, size, mtime, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        doc_id = conn.execute("SELECT id FROM documents WHERE path = ?", (path,)).fetchone()[0]
+        db_query("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+        db_query("INSERT INTO documents_fts (rowid, name, body) VALUES (?, ?, ?)", (doc_id, path, text))
+
+
+def forget_documents(paths):
+    """Remove paths from the search index."""
+    rows = [(os.path.normpath(path),) for path in paths]
+    if not rows:
+        return
+    with transaction():
+        db_execute_many("DELETE FROM documents_fts WHERE rowid = (SELECT id FROM documents WHERE path = ?)", rows)
+        db_execute_many("DELETE FROM documents WHERE path = ?", rows)
+
+
+class TextIndexer:
+    """Extracts text on a process pool and writes each result into documents_fts."""
+
+    def __init__(self, workers=EXTRACT_WORKERS):
+        # spawn, not fork: forking a process that runs Qt and DB threads is unsafe
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        if not pdf_text_available():
+            print(f"[SEARCH WARNING] {PDF_TEXT_MISSING}")
+        self._pending = set()
+        self._idle = threading.Condition()
+
+    def submit(self, path):
+        """Queue path for (re-)extraction; returns False if it isn't searchable or already queued."""
+        key = os.path.normpath(path)
+        if os.path.splitext(key)[1].lower() not in SEARCHABLE_EXTENSIONS:
+            return False
+        with self._idle:
+            if key in self._pending:
+                return False
+            try:
+                st = os.stat(key)
+            except OSError:
+                return False
+            self._pending.add(key)
+        future = self.pool.submit(extract_text, key)
+        future.add_done_callback(lambda done: self._store(key, st, done))
+        return True
+
+    def _store(self, key, st, future):
+        try:
+            try:
+                text = future.result()
+            except CancelledError:
+                return
+            except Exception as e:
+                # Still index the name so the file can be found
+                print(f"[SEARCH] Could not extract text from {key}: {e}")
+                text = ""
+            store_document(key, st.st_size, st.st_mtime, text)
+        except sqlite3.Error as e:
+            print(f"[SEARCH ERROR] Failed to index {key}: {e}")
+        finally:
+            with self._idle:
+                self._pending.discard(key)
+                self._idle.notify_all()
+
+    def pending(self):
+        with self._idle:
+            return len(self._pending)
+
+    def join(self, timeout=None):
+        """Block until everything queued so far has been indexed."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+_indexer = None
+_indexer_lock = threading.Lock()
+
+
+def get_indexer():
+    global _indexer
+    with _indexer_lock:
+        if _indexer is None:
+            _indexer = TextIndexer()
+        return _indexer
+
+
+def index_documents(paths):
+    """Queue files that were just uploaded or moved; returns how many were queued."""
+    paths = [path for path in paths if os.path.splitext(path)[1].lower() in SEARCHABLE_EXTENSIONS]
+    if not paths:
+        return 0
+    indexer = get_indexer()
+    return sum(indexer.submit(path) for path in paths)
+
+
+def sync_documents():
+    """Match the search index to the files index: queue new or changed files, drop vanished ones."""
+    conn = get_connection()
+    placeholders = ", ".join("?" for _ in SEARCHABLE_EXTENSIONS)
+    files = {path: (size, mtime) for path, size, mtime in conn.execute(
+        f"SELECT path, size, mtime FROM files WHERE is_dir = 0 AND type IN ({placeholders})",
+        [ext.lstrip(".") for ext in SEARCHABLE_EXTENSIONS])}
+    documents = {path: (size, mtime) for path, size, mtime in
+                 conn.execute("SELECT path, size, mtime FROM documents")}
+    forget_documents([path for path in documents if path not in files])
+    return index_documents([path for path, stat in files.items() if documents.get(path) != stat])
+
+
+def shutdown_text_indexer():
+    global _indexer
+    with _indexer_lock:
+        indexer, _indexer = _indexer, None
+    if indexer is not None:
+        indexer.shutdown()
+
+
+def match_expression(text):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def search(text, limit=SEARCH_LIMIT):
+    """[(path, snippet)] best match first; matched words in the snippet are [bracketed]."""
+    expression = match_expression(text)
+    if expression is None:
+        return []
+    return db_query(SEARCH_SQL, (expression, limit))
+
+
+if __name__ == "__main__":
+    # python text_search.py            -> (re)index everything in the folder trees
+    # python text_search.py some words -> run a search
+    from migrations import migrate
+    migrate()
+    if len(sys.argv) > 1:
+        for path, snippet in search(" ".join(sys.argv[1:])):
+            print(f"{path}\n    {snippet}")
+    else:
+        from file_index import refresh_all
+        refresh_all()
+        print(f"Queued {sync_documents()} document(s) for text extraction...")
+        if _indexer is not None:
+            _indexer.join()
+        shutdown_text_indexer()
+        print("Search index is up to date.")
@@ -0,0 +1,153 @@
+# uploads.py
+# Stores dropped files into the storage folders on a small thread pool so
+# big batches don't block the GUI. Files go through blob_store, so a body
+# that is already stored elsewhere is only hashed and linked, never copied.
+# run_upload() is meant to be run through workers.run_in_background(...,
+# pass_task=True): it reports progress via task.report() and stops early
+# when task.is_cancelled().
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from blob_store import StoreCancelled, store_file
+from db import db_execute_many, transaction
+
+UPLOAD_WORKERS = 4
+PROGRESS_STEP = 4 * 1024 * 1024  # report per-file progress at most every 4 MB
+
+
+class UploadResult:
+    """Outcome of one batch: succeeded/failed/skipped lists of file names."""
+
+    def __init__(self):
+        self.succeeded = []   # blob_store.StoredFile
+        self.failed = []      # (file name, reason)
+        self.cancelled = []   # file names never copied because of cancel
+
+    @property
+    def success_count(self):
+        return len(self.succeeded)
+
+    @property
+    def failure_count(self):
+        return len(self.failed)
+
+    @property
+    def deduplicated_count(self):
+        return sum(1 for stored in self.succeeded if stored.deduplicated)
+
+    def summary(self):
+        text = f"✅ Successfully uploaded: {self.success_count} file(s)\n❌ Failed to upload: {self.failure_count} file(s)"
+        if self.deduplicated_count:
+            text += f"\n♻ Already stored, linked without copying: {self.deduplicated_count} file(s)"
+        if self.cancelled:
+            text += f"\n⏹ Cancelled: {len(self.cancelled)} file(s)"
+        return text
+
+
+class UploadLogRecorder:
+    """Collects upload_log rows for one drop and writes them in one transaction."""
+
+    def __init__(self, folder, uploaded_by):
+        self.folder = folder
+        self.uploaded_by = uploaded_by
+        self.rows = []
+
+    def add(self, stored):
+        self.rows.append((
+            os.path.basename(stored.dst),
+            self.folder,
+            self.uploaded_by,
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            stored.size,
+            stored.sha256,
+        ))
+
+    def add_all(self, stored_files):
+        for stored in stored_files:
+            self.add(stored)
+
+    def flush(self):
+        """Write every collected row with one executemany; returns the row count."""
+        if not self.rows:
+            return 0
+        with transaction():
+            db_execute_many('''INSERT INTO upload_log (filename, folder, uploaded_by, uploaded_at, size, sha256)
+                               VALUES (?, ?, ?, ?, ?, ?)''', self.rows)
+        count = len(self.rows)
+        self.rows = []
+        return count
+
+
+def run_upload(file_paths, target_dir, allowed_extensions, task=None):
+    """Copy file_paths into target_dir; returns an UploadResult.
+
+    Progress events are dicts: {"file", "done", "size"} while a file copies
+    (done == size once it finishes, or "error" set if it failed) plus
+    aggregate "total_done"/"total_size" byte counts for the whole batch.
+    """
+    is_cancelled = task.is_cancelled if task is not None else (lambda: False)
+    report = task.report if task is not None else (lambda value: None)
+    result = UploadResult()
+    os.makedirs(target_dir, exist_ok=True)
+
+    jobs = []
+    for path in file_paths:
+        name = os.path.basename(path)
+        if os.path.splitext(path)[1].lower() not in allowed_extensions:
+            result.failed.append((name, "unsupported file type"))
+            continue
+        try:
+            jobs.append((path, os.path.join(target_dir, name), os.path.getsize(path)))
+        except OSError as e:
+            result.failed.append((name, str(e)))
+
+    total_size = sum(size for _, _, size in jobs)
+    totals = {"done": 0}
+    lock = threading.Lock()
+
+    def copy_one(job):
+        src, dst, size = job
+        name = os.path.basename(src)
+        if is_cancelled():
+            with lock:
+                result.cancelled.append(name)
+            return
+        state = {"done": 0, "reported": 0}
+
+        def on_bytes(n):
+            state["done"] += n
+            with lock:
+                totals["done"] += n
+                total_done = totals["done"]
+            if state["done"] - state["reported"] >= PROGRESS_STEP:
+                state["reported"] = state["done"]
+                report({"file": name, "done": state["done"], "size": size,
+                        "total_done": total_done, "total_size": total_size})
+
+        try:
+            stored = store_file(src, dst, is_cancelled, on_bytes)
+        except StoreCancelled:
+            with lock:
+                totals["done"] -= state["done"]
+                result.cancelled.append(name)
+            return
+        except (OSError, sqlite3.Error) as e:
+            with lock:
+                totals["done"] -= state["done"]
+                result.failed.append((name, str(e)))
+                total_done = totals["done"]
+            report({"file": name, "done": 0, "size": size, "error": str(e),
+                    "total_done": total_done, "total_size": total_size})
+            return
+        with lock:
+            result.succeeded.append(stored)
+            total_done = totals["done"]
+        report({"file": name, "done": size, "size": size,
+                "total_done": total_done, "total_size": total_size})
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+        list(pool.map(copy_one, jobs))
+    return result
@@ -0,0 +1,90 @@
+# workers.py
+# Generic "run this callable off the GUI thread" helper for slow non-query
+# work (password hashing, file copies, ...). Results come back through
+# queued Qt signals, so handlers run on the GUI thread. See db_async.py for
+# the query-specific equivalent.
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+_active = set()  # tasks in flight, kept referenced until their signals are delivered
+
+
+class TaskSignals(QObject):
+    result = Signal(object)
+    error = Signal(str)
+    progress = Signal(object)
+    done = Signal()
+
+
+class FunctionTask(QRunnable):
+    """Calls func(*args, **kwargs) on a pool thread.
+
+    With pass_task=True, func is also given ``task=`` this task so it can call
+    report() for progress and poll is_cancelled() between units of work.
+    """
+
+    def __init__(self, func, args=(), kwargs=None, pass_task=False):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.kwargs = dict(kwargs or {})
+        if pass_task:
+            self.kwargs["task"] = self
+        self.signals = TaskSignals()
+        self._cancelled = threading.Event()
+        self._discard = threading.Event()
+
+    def cancel(self, *_args):
+        """Stop as soon as possible and drop the result (e.g. the dialog closed)."""
+        self._discard.set()
+        self._cancelled.set()
+
+    def stop(self, *_args):
+        """Ask func to stop early but still deliver whatever it returns."""
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def report(self, value):
+        if not self._discard.is_set():
+            self.signals.progress.emit(value)
+
+    def run(self):
+        try:
+            if self._discard.is_set():
+                return
+            try:
+                result = self.func(*self.args, **self.kwargs)
+            except Exception as e:
+                if not self._discard.is_set():
+                    self.signals.error.emit(str(e))
+                return
+            if not self._discard.is_set():
+                self.signals.result.emit(result)
+        finally:
+            self.signals.done.emit()
+
+
+def run_in_background(func, *args, on_result=None, on_error=None, on_progress=None,
+                      owner=None, pool=None, pass_task=False, **kwargs):
+    """Queue func on a thread pool (the global one by default) and return the task.
+
+    If owner is a dialog, the task is cancelled when the dialog finishes.
+    """
+    task = FunctionTask(func, args, kwargs, pass_task)
+    if on_result is not None:
+        task.signals.result.connect(on_result)
+    if on_error is not None:
+        task.signals.error.connect(on_error)
+    if on_progress is not None:
+        task.signals.progress.connect(on_progress)
+    if owner is not None:
+        closed = getattr(owner, "finished", None) or owner.destroyed
+        closed.connect(task.cancel)
+    task.signals.done.connect(lambda: _active.discard(task))
+    task.setAutoDelete(False)
+    _active.add(task)
+    (pool or QThreadPool.globalInstance()).start(task)
+    return task